@@ -2,299 +2,387 @@
 
 # Benchmark several algorithms for solving Sudoku.
 
-# Results:
-#   Iterative algorithm execution time: 0.07956981658935547
-#   Stack-based algorithm execution time: 1.5783979892730713
-#   Backtracking algorithm execution time: 2.2110557556152344
-
-import time
+# Every selected solver is run on every selected corpus: first a few
+# untimed warmup passes, then a number of timed passes in which each puzzle
+# is timed on its own with time.perf_counter(). The per-puzzle latencies of
+# all the timed passes give the median, 95th and 99th percentiles, and the
+# time of a whole pass over the corpus is reported as the median of the passes.
+
+# Usage:
+#   python sudoku_solvers.py
+#   python sudoku_solvers.py -s iterative dancing_links -c hard 17-clue -r 20
+#   python sudoku_solvers.py -o after.json --baseline before.json
+#   python sudoku_solvers.py --stats -c hard
+#   python sudoku_solvers.py --batch 5000 -c easy hard 17-clue
+#   python sudoku_solvers.py --flat
+
+# With --output the results are also written as JSON, and with --baseline
+# the total times are compared with those of a previous JSON file, to spot
+# performance regressions.
+
+# With --stats every solver makes one more, untimed, pass over the corpus with
+# a SearchStats object, and the search nodes, backtracks, maximum depth,
+# propagation passes and deductions are reported, along with the puzzle that
+# needed the most nodes.
+
+# With --batch the corpora are instead repeated to the given number of puzzles,
+# which are solved in bulk by the NumPy batch solver (which requires NumPy)
+# and, one at a time, by the iterative solver, in puzzles per second.
+
+# With --flat the puzzles are given to the solvers as flat bytearrays of N^2
+# cells, instead of lists of rows.
+
+# Results (-r 10):
+#   solver                     corpus        total     median        p95        p99   change
+#   iterative                  easy       0.007308   0.000569   0.001414   0.001513
+#   dancing_links              easy       0.008129   0.000663   0.000892   0.005073
+#   stack                      easy       0.025721   0.002043   0.002974   0.003169
+#   backtracking               easy       0.026861   0.002061   0.003195   0.003848
+#   iterative                  hard       0.023913   0.001952   0.011072   0.011137
+#   dancing_links              hard       0.024952   0.002418   0.017749   0.017986
+#   stack                      hard       0.073267   0.004900   0.051146   0.051468
+#   backtracking               hard       0.062487   0.004607   0.049344   0.050839
+#   iterative                  17-clue    0.015653   0.001121   0.003081   0.003476
+#   dancing_links              17-clue    0.037160   0.001003   0.009588   0.010608
+#   stack                      17-clue    0.082711   0.003132   0.031974   0.032161
+#   backtracking               17-clue    0.085255   0.003268   0.032234   0.032862
+#   iterative                  16x16      0.104894   0.016867   0.040035   0.041061
+#   dancing_links              16x16      0.046656   0.007337   0.012135   0.038601
+#   stack                      16x16      0.088704   0.012755   0.023298   0.025391
+#   backtracking               16x16      0.071879   0.010699   0.019565   0.021651
+#   iterative                  25x25      0.088987   0.019553   0.071811   0.076148
+#   dancing_links              25x25      0.078099   0.020587   0.044465   0.046556
+#   stack                      25x25      0.099402   0.030170   0.053801   0.058807
+#   backtracking               25x25      0.114005   0.036136   0.058780   0.070480
+
+import argparse
 import copy
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Games'))
+
+from sudoku import parse_puzzle
+from sudoku_board import BoardState, SearchStats, is_flat, to_flat, percentile
+from sudoku_solver_iterative import solve_sudoku as solve_sudoku_iterative
+from sudoku_solver_stack import solve_sudoku as solve_sudoku_stack
+from sudoku_solver_dancing_links import solve_sudoku as solve_sudoku_dancing_links
+from sudoku_solver_recursive import solve_sudoku as solve_sudoku_backtracking
+
+def solve_sudoku_backtracking_first_empty(board, stats=None):
+    if stats is not None:
+        stats.start()
 
-def is_valid(board, row, col, num):
-    # Check if the number is not present in the current row and column
-    for i in range(9):
-        if board[row][i] == num or board[i][col] == num:
-            return False
-
-    # Check if the number is not present in the current 3x3 subgrid
-    start_row, start_col = 3 * (row // 3), 3 * (col // 3)
-    for i in range(3):
-        for j in range(3):
-            if board[start_row + i][start_col + j] == num:
-                return False
-
-    return True
-
-def find_empty_location(board):
-    # Find an empty position (cell with 0)
-    for i in range(9):
-        for j in range(9):
-            if board[i][j] == 0:
-                return i, j
-    return None, None  # If the board is filled
-
-def find_empty_locations(board):
-
-    empty_locations = []
-
-    # Find all empty positions (cells with 0)
-    for i in range(9):
-        for j in range(9):
-            if board[i][j] == 0:
-                empty_locations.append((i, j))
-
-    return empty_locations
-
-def solve_sudoku_iterative(board):
-
-    while True:
-
-        empty_locations = find_empty_locations(board)
-
-        if len(empty_locations) == 0:
-            break   # it's solved
-
-        found = False
-
-        # Solve simple cases
-        for i, j in empty_locations:
-            count = 0
-            value = 0
-            for n in range(1,10):
-                if is_valid(board, i, j, n):
-                    count += 1
-                    value = n
-                    if count > 1: break
-            if count == 1:
-                board[i][j] = value
-                found = True
-
-        if found: continue
-
-        # Solve more complex cases
-        stats = [[0]*9 for x in range(10)]
-        for i,j in empty_locations:
-            arr = []
-            for n in range(1, 10):
-                if is_valid(board, i, j, n):
-                    arr.append(n)
-            stats[i][j] = arr
-
-        cols    = [ [0]*10 for x in range(10)]
-        rows    = [ [0]*10 for x in range(10)]
-        subgrid = [[[0]*10 for x in range(10)] for y in range(10)]
-
-        for i,j in empty_locations:
-            for v in stats[i][j]:
-                rows[i][v] += 1
-                cols[j][v] += 1
-                subgrid[3*(i//3)][3*(j//3)][v] += 1
-
-        for i,j in empty_locations:
-            for v in stats[i][j]:
-                if (cols[j][v] == 1 or
-                    rows[i][v] == 1 or
-                    subgrid[3*(i//3)][3*(j//3)][v] == 1):
-                    board[i][j] = v
-                    found = True
-
-        if found: continue
-
-        # Give up
-        solve_sudoku_backtracking(board)
-        return board
-
-    return board
-
-def solve_sudoku_stack(board):
-    stack = []
-    stack.append(board)
-
-    while stack:
-        current_board = stack.pop()
-        row, col = find_empty_location(current_board)
-
-        if row is None and col is None:
-            return current_board
-
-        for num in range(1, 10):
-            if is_valid(current_board, row, col, num):
-                new_board = [row[:] for row in current_board]
-                new_board[row][col] = num
-                stack.append(new_board)
+    state  = BoardState(board)
+    digits = state.geo.digits
+    empty_locations = state.empty_locations()
 
-    return None
+    def solve(k):
+        if k == len(empty_locations):
+            return True  # Puzzle is solved
 
-def solve_sudoku_backtracking(board):
-    row, col = find_empty_location(board)
+        row, col = empty_locations[k]
 
-    if row is None and col is None:
-        return True  # Puzzle is solved
+        for num in digits[state.candidates(row, col)]:
+            if stats is not None:
+                stats.enter(k + 1)
 
-    for num in range(1, 10):
-        if is_valid(board, row, col, num):
             # Try placing the number
-            board[row][col] = num
+            state.place(row, col, num)
 
             # Recursively try to solve the rest of the puzzle
-            if solve_sudoku_backtracking(board):
+            if solve(k + 1):
                 return True
 
             # If placing the current number doesn't lead to a solution, backtrack
-            board[row][col] = 0
-
-    return False  # No solution found
-
-# Your test Sudoku puzzles
-puzzles = [
-    [
-        [5, 3, 0, 0, 7, 0, 0, 0, 0],
-        [6, 0, 0, 1, 9, 5, 0, 0, 0],
-        [0, 9, 8, 0, 0, 0, 0, 6, 0],
-        [8, 0, 0, 0, 6, 0, 0, 0, 3],
-        [4, 0, 0, 8, 0, 3, 0, 0, 1],
-        [7, 0, 0, 0, 2, 0, 0, 0, 6],
-        [0, 6, 0, 0, 0, 0, 2, 8, 0],
-        [0, 0, 0, 4, 1, 9, 0, 0, 5],
-        [0, 0, 0, 0, 8, 0, 0, 7, 9]
-    ],
-    [
-        [5, 3, 0, 0, 7, 0, 0, 0, 0],
-        [6, 0, 0, 1, 9, 5, 0, 0, 0],
-        [0, 9, 8, 0, 0, 0, 0, 6, 0],
-        [8, 0, 0, 0, 6, 0, 0, 0, 3],
-        [4, 0, 0, 8, 0, 3, 0, 0, 1],
-        [7, 0, 0, 0, 2, 0, 0, 0, 0],
-        [0, 6, 0, 0, 0, 0, 2, 8, 0],
-        [0, 0, 0, 4, 1, 9, 0, 0, 0],
-        [0, 0, 0, 0, 8, 0, 0, 7, 0]
-    ],
-    [
-        [0, 0, 3, 0, 2, 0, 6, 0, 0],
-        [9, 0, 0, 3, 0, 5, 0, 0, 1],
-        [0, 0, 1, 8, 0, 6, 4, 0, 0],
-        [0, 0, 8, 1, 0, 2, 9, 0, 0],
-        [7, 0, 0, 0, 0, 0, 0, 0, 8],
-        [0, 0, 6, 7, 0, 8, 2, 0, 0],
-        [0, 0, 2, 6, 0, 9, 5, 0, 0],
-        [8, 0, 0, 2, 0, 3, 0, 0, 9],
-        [0, 0, 5, 0, 1, 0, 3, 0, 0]
-    ],
-    [
-        [2, 0, 0, 0, 8, 0, 3, 0, 0],
-        [0, 6, 0, 0, 7, 0, 0, 8, 4],
-        [0, 3, 0, 5, 0, 0, 2, 0, 9],
-        [0, 0, 0, 1, 0, 5, 4, 0, 8],
-        [0, 0, 0, 0, 0, 0, 0, 0, 0],
-        [4, 0, 2, 7, 0, 6, 0, 0, 0],
-        [3, 0, 1, 0, 0, 7, 0, 4, 0],
-        [7, 2, 0, 0, 4, 0, 0, 6, 0],
-        [0, 0, 4, 0, 1, 0, 0, 0, 3]
-    ],
-    [
-        [0, 0, 0, 0, 0, 0, 9, 0, 7],
-        [0, 0, 0, 4, 2, 0, 1, 8, 0],
-        [0, 0, 0, 7, 0, 5, 0, 2, 6],
-        [1, 0, 0, 9, 0, 4, 0, 0, 0],
-        [0, 5, 0, 0, 0, 0, 0, 4, 0],
-        [0, 0, 0, 5, 0, 7, 0, 0, 9],
-        [9, 2, 0, 1, 0, 8, 0, 0, 0],
-        [0, 3, 4, 0, 5, 9, 0, 0, 0],
-        [5, 0, 7, 0, 0, 0, 0, 0, 0]
-    ],
-    [
-        [0, 3, 0, 0, 5, 0, 0, 4, 0],
-        [0, 0, 8, 0, 1, 0, 5, 0, 0],
-        [4, 6, 0, 0, 0, 0, 0, 1, 2],
-        [0, 7, 0, 5, 0, 2, 0, 8, 0],
-        [0, 0, 0, 6, 0, 3, 0, 0, 0],
-        [0, 4, 0, 1, 0, 9, 0, 3, 0],
-        [2, 5, 0, 0, 0, 0, 0, 9, 8],
-        [0, 0, 1, 0, 2, 0, 6, 0, 0],
-        [0, 8, 0, 0, 6, 0, 0, 2, 0]
-    ],
-    [
-        [0, 2, 0, 8, 1, 0, 7, 4, 0],
-        [7, 0, 0, 0, 0, 3, 1, 0, 0],
-        [0, 9, 0, 0, 0, 2, 8, 0, 5],
-        [0, 0, 9, 0, 4, 0, 0, 8, 7],
-        [4, 0, 0, 2, 0, 8, 0, 0, 3],
-        [1, 6, 0, 0, 3, 0, 2, 0, 0],
-        [3, 0, 2, 7, 0, 0, 0, 6, 0],
-        [0, 0, 5, 6, 0, 0, 0, 0, 8],
-        [0, 7, 6, 0, 5, 1, 0, 9, 0]
-    ],
-    [
-        [1, 0, 0, 9, 2, 0, 0, 0, 0],
-        [5, 2, 4, 0, 1, 0, 0, 0, 0],
-        [0, 0, 0, 0, 0, 0, 0, 7, 0],
-        [0, 5, 0, 0, 0, 8, 1, 0, 2],
-        [0, 0, 0, 0, 0, 0, 0, 0, 0],
-        [4, 0, 2, 7, 0, 0, 0, 9, 0],
-        [0, 6, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 0, 0, 3, 0, 9, 4, 5],
-        [0, 0, 0, 0, 7, 1, 0, 0, 6]
-    ],
-    [
-        [0, 4, 3, 0, 8, 0, 2, 5, 0],
-        [6, 0, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 0, 0, 0, 1, 0, 9, 4],
-        [9, 0, 0, 0, 0, 4, 0, 7, 0],
-        [0, 0, 0, 6, 0, 8, 0, 0, 0],
-        [0, 1, 0, 2, 0, 0, 0, 0, 3],
-        [8, 2, 0, 5, 0, 0, 0, 0, 0],
-        [0, 0, 0, 0, 0, 0, 0, 0, 5],
-        [0, 3, 4, 0, 9, 0, 7, 1, 0]
-    ],
-    [
-        [4, 8, 0, 0, 0, 6, 9, 0, 2],
-        [0, 0, 2, 0, 0, 8, 0, 0, 1],
-        [9, 0, 0, 3, 7, 0, 0, 6, 0],
-        [8, 4, 0, 0, 1, 0, 2, 0, 0],
-        [0, 0, 3, 7, 0, 4, 1, 0, 0],
-        [0, 0, 1, 0, 6, 0, 0, 4, 9],
-        [0, 2, 0, 0, 8, 5, 0, 0, 7],
-        [7, 0, 0, 9, 0, 0, 6, 0, 0],
-        [6, 0, 9, 2, 0, 0, 0, 1, 8]
-    ],
-    [
-        [0, 0, 0, 9, 0, 0, 0, 0, 2],
-        [0, 5, 0, 1, 2, 3, 4, 0, 0],
-        [0, 3, 0, 0, 0, 0, 1, 6, 0],
-        [9, 0, 8, 0, 0, 0, 0, 0, 0],
-        [0, 7, 0, 0, 0, 0, 0, 9, 0],
-        [0, 0, 0, 0, 0, 0, 2, 0, 5],
-        [0, 9, 1, 0, 0, 0, 0, 5, 0],
-        [0, 0, 7, 4, 3, 9, 0, 2, 0],
-        [4, 0, 0, 0, 0, 7, 0, 0, 0]
-    ],
-    [
-        [2, 0, 0, 0, 7, 0, 0, 0, 3],
-        [1, 0, 0, 0, 0, 0, 0, 8, 0],
-        [0, 0, 4, 2, 0, 9, 0, 0, 5],
-        [9, 4, 0, 0, 0, 0, 6, 0, 8],
-        [0, 0, 0, 8, 0, 0, 0, 9, 0],
-        [0, 0, 0, 0, 0, 0, 0, 7, 0],
-        [7, 2, 1, 9, 0, 8, 0, 6, 0],
-        [0, 3, 0, 0, 2, 7, 1, 0, 0],
-        [4, 0, 0, 0, 0, 3, 0, 0, 0]
-    ],
+            state.unplace(row, col)
+
+            if stats is not None:
+                stats.backtracks += 1
+
+        return False  # No solution found
+
+    solved = solve(0)
+
+    if stats is not None:
+        stats.lap('search')
+
+    return solved
+
+# Test Sudoku puzzles, one string per puzzle in row-major order, with '.' for
+# the empty cells and the digits above 9 written as letters (A = 10, B = 11, ...)
+
+puzzles_easy = [
+    "53..7....6..195....98....6.8...6...34..8.3..17...2...6.6....28....419..5....8..79",
+    "53..7....6..195....98....6.8...6...34..8.3..17...2.....6....28....419.......8..7.",
+    "..3.2.6..9..3.5..1..18.64....81.29..7.......8..67.82....26.95..8..2.3..9..5.1.3..",
+    "2...8.3...6..7..84.3.5..2.9...1.54.8.........4.27.6...3.1..7.4.72..4..6...4.1...3",
+    "......9.7...42.18....7.5.261..9.4....5.....4....5.7..992.1.8....34.59...5.7......",
+    ".3..5..4...8.1.5..46.....12.7.5.2.8....6.3....4.1.9.3.25.....98..1.2.6...8..6..2.",
+    ".2.81.74.7....31...9...28.5..9.4..874..2.8..316..3.2..3.27...6...56....8.76.51.9.",
+    "1..92....524.1...........7..5...81.2.........4.27...9..6...........3.945....71..6",
+    ".43.8.25.6.............1.949....4.7....6.8....1.2....382.5.............5.34.9.71.",
+    "48...69.2..2..8..19..37..6.84..1.2....37.41....1.6..49.2..85..77..9..6..6.92...18",
+    "...9....2.5.1234...3....16.9.8.......7.....9.......2.5.91....5...7439.2.4....7...",
+    "2...7...31......8...42.9..594....6.8...8...9........7.7219.8.6..3..271..4....3...",
+]
+
+puzzles_hard = [
+    "8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..",
+    "85...24..72......9..4.........1.7..23.5...9...4...........8..7..17..........36.4.",
+    "..53.....8......2..7..1.5..4....53...1..7...6..32...8..6.5....9..4....3......97..",
+    "12..4......5.69.1...9...5.........7.7...52.9..3......2.9.6...5.4..9..8.1..3...9.4",
+    "...57..3.1......2.7...234......8...4..7..4...49....6.5.42...3.....7..9....18.....",
+]
+
+# Minimal puzzles, with only 17 clues
+puzzles_17_clue = [
+    "...8.1..........435............7.8........1...2..3....6......75..34........2..6..",
+    ".......1.4.........2...........5.4.7..8...3....1.9....3..4..2...5.1........8.6...",
+    ".......1.4.........2...........5.6.4..8...3....1.9....3..4..2...5.1........8.7...",
+    ".......12....35......6...7.7.....3.....4..8..1...........12.....8.....4..5....6..",
+    ".......12..36..........7...41..2.......5..3..7.....6..28.....4....3..5...........",
+    ".......12..8.3...........4.12.5..........47...6.......5.7...3.....62.......1.....",
+    "4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......",
+    "52...6.........7.13...........4..8..6......5...........418.........3..2...87.....",
+    "6.....8.3.4.7.................5.4.7.3..2.....1.6.......2.....5.....8.6......1....",
+    "48.3............71.2.......7.5....6....2..8.............1.76...3.....4......5....",
+    "....14....3....2...7..........9...3.6.1.............8.2.....1.4....5.6.....7.8...",
+]
+
+puzzles_16x16 = [
+    ("F.9.A..6G...73..375..8CG6.1.EF.9.16A4..5.FE..8.G8.GDBF.9.3.....6"
+     "5..7C..3...1D9.8.4..E9.82...B.1F6BF17.A2.....GC3...E...F.G......"
+     ".9...1....G..7....4..E.D.7..6....5A3.CG..1.2.EF...B.37.....FG.84"
+     "B..6...1C.8..4.7A.1.G43.E.....9.43..9D8....5..6..8...B......2..."),
+    (".D..G....3.B..6.G4...29..8.D1B.A5.6.A.13.7F4.D8......D...69.F..G"
+     "2.95.6.14.G8...D....2759...3A6...61...E..9.7..F..3CE.8.....6...."
+     "1....E.....5.G2.95..1..D...G.....G..956BC48........8..7.1.3..5.9"
+     "..G4..2.3ED1B.A..1..8.4..A.......9..31.E7..F.C.....26...8G.....3"),
+    ("...5.9B.E4..G7F.4C.....F.2B9..A3F76GE.....D..B2......3..GF..E.4."
+     ".82...51.......4...........4DG..9E4BD.G37..2C...3GFDB..9C15.7..."
+     "E..1...G9..B..5..FD.9...1EAC....8.B.3...6G.7.....2.6.C.E..F.948B"
+     "..G.4E....35.9..7..2.53.FD6.41.E...A.897..1E..DGB1E4.G....98A3C."),
+    ("....D.3.4..5.BA8...4..B..2C.D3.E.3.D.6.1...B........F2....E.45.."
+     "...C.465.9B..2F756....A.8...C.D..A918F..CD.GE.4....8C..3.4.6..9."
+     "2.8B.C...E..591A.DC7..4...A9..8.A.1..8.27.GD.4E.6..3..9..8..7..."
+     ".....B.F.7D...3.D..2....659.A8B.4....519AB..2.7.F8B...CDG3.E...9"),
+    (".....7..3BG.......7DG..E8.5..C.FG..3..8.FCA....D.2...CF.D71.G..."
+     "B...6..F1.C.7.3...4.7.G.5......A.3..B..8A.6..4D16F...41.G.73B..5"
+     "2.F.9..1..4.E85...D...7....52F.6E58B2..ACD...3.......8...F.A.D1."
+     ".B.E.A.6.1..D.748.A......GD7.5.ED..43..B...6F1..F.19..47.5....62"),
+    ("D..48.A5..3.......2..DC9..1..F7E..58E37FGB62D9C43...B6G..4......"
+     "B2....9...8.E3.A..1..E...7.6...GEF3.7B.6..4...5C..DGC851FA.3B62."
+     ".6BF..D.1..8..35..895.3...7..4....E.....D2.4.819G.429C...5AE7.6F"
+     "5E.1.FB..6.G.C8D.4G..9.C.15..7B3..7..2.G8......198...5EA.3F.2G.."),
+]
+
+puzzles_25x25 = [
+    ("7AG.1.L..D..N.H.65E.M.CF9F9M....B56J.A.G8P..O2....O....MCF94.K5.E....3GJ..."
+     "3I2.LH8..P..9.M...G.E...5B......7AJ.LI...49.F..8.NEBKN..J.7..D3.L.I.C..A.HO"
+     ".F.I...E.N.J..1.A.8.L5..3..L.......I4.....71.KN..B..19JLD2.5A..H8...K.....F"
+     "HO8A.C4MF...BEKD.3.2.9..7N6O8HF.9.C.E.5.2L.3.....P..FCM.E.DK1G.A7H8.O..L..."
+     "AP...32.4..H6...KD......JI43..O...8..J9.G....BKE5D5.BK.7GAP1.2.I.M.JF.O..N."
+     "....A4.C...N......D.....GK..ONJ9.GFB5..D..M..P.A.H.M.3I.N.E...G1J.7HP.DB..."
+     "L2DB5...H..IM.49..J16O.KE..J.9D5L2B7.H8.NOE.K...CM..5.BA..8G.3..IF.1.J.H..K"
+     "6KN..9FJ.M.B...32.I.AG.P8.19.F.BD.E.7....H.N.I2..C4...3N...HM.1J.7....5.BD."
+     "P....I.4C.HO.6..EL.D..FJ."),
+    ("A..NM6K.8F.G3..5CB.P..2I..I.12B....MHN..9G3L.K.....GL3.1J.I2P.B...86KF.AMH."
+     "....P.O.H.F864..I1..L...34...F3L9...I.7J..N..D5PCB..9K8.7E1..BJ2..6O.HAP.N."
+     "PN..CO.M6.8.K.92B...7.G.L2..JI..PN..6O.4...7.9F..KM6.OHK..3..1.E...DA.5.IBJ"
+     ".17..J52BICND.A.3...4.H.O....A.6..4..8K.J.I.5..72.KE38...L.7..I....H..N.A.."
+     "L.1G.I.J....CDNK.8..6O.FHJPBI..N.MA.FHO...G17..9.8..6.4.3KE.7..L1....ABJ5.."
+     ".7..L.I15JDA....9.8..N..M.ACP...N.OK.....5...G..7E.5.2JP.BADO....3.E...6..."
+     "698F.....LJ5.1IN4MH.CB....4HM.F..9.L.E3G..PCD.1J5.8.E9.72.J....IPH.4.6MC..A"
+     ".DP....CON...HF..72.E83..HKF4.9E8..1.7G...AM.PIBD5....15.I..N..CM.......6K."
+     "CO...4FH.6..9..ID.P.2...7"),
+    (".FI7...2L.PA....8...K1GC..N84.7.I..1H..KP.A596..23.PD...N8.MO32L.1...K7FEIJ"
+     "3O..LK1CG.N.8.4.I.E79.5.A..CK...D5..J..7O.3.64..8ME...9...4.A5....N..8C..1G"
+     "...D68M.K..L..2.1.7...9FE...8K....E..17.A.5.D.34.LL......17...NK8.FE.IDA..."
+     "GH..7....5..F9...L42...NB..4LM.I.J.C1K.B.9..E.2.6O1CKB.ED...I.7JG..O.5.8M4N"
+     ".I......3ODP..E.4N.L..H.1.2...BCKH1..4.LI7FJG...9..D.E.L....2O6.5CK1H.GI.7F"
+     "D9E.P.4LN86......C..H7FGI26..O.K..C..LN37GI..J9.....BM..9EP.....H6..OA.4.L."
+     ".7...A..O29......8N.MK.BC8.L3..7..I..B1M9EDPJ..O5..L3.81.H....M.NEJ.....2A."
+     "KB.N..EJD9G.HI1.A6..O......AP2NBMCKL4...G..I....J..GH.IP.A.6E.JDF..4.O.BCM."
+     "9EJ..O...4.....B.KC.1.I.."),
 ]
 
-start_time = time.time()
-for puzzle in puzzles:
-    solve_sudoku_iterative(copy.deepcopy(puzzle))
-end_time = time.time()
-print("Iterative algorithm execution time:", end_time - start_time)
-
-start_time = time.time()
-for puzzle in puzzles:
-    solve_sudoku_stack(copy.deepcopy(puzzle))
-end_time = time.time()
-print("Stack-based algorithm execution time:", end_time - start_time)
-
-start_time = time.time()
-for puzzle in puzzles:
-    solve_sudoku_backtracking(copy.deepcopy(puzzle))
-end_time = time.time()
-print("Backtracking algorithm execution time:", end_time - start_time)
+CORPORA = {
+    'easy'    : puzzles_easy,
+    'hard'    : puzzles_hard,
+    '17-clue' : puzzles_17_clue,
+    '16x16'   : puzzles_16x16,
+    '25x25'   : puzzles_25x25,
+}
+
+# The first-empty-cell backtracking is not run by default, as its search
+# tree grows too quickly on the hard and the larger puzzles.
+SOLVERS = {
+    'iterative'                : solve_sudoku_iterative,
+    'dancing_links'            : solve_sudoku_dancing_links,
+    'stack'                    : solve_sudoku_stack,
+    'backtracking'             : solve_sudoku_backtracking,
+    'backtracking_first_empty' : solve_sudoku_backtracking_first_empty,
+}
+
+DEFAULT_SOLVERS = ['iterative', 'dancing_links', 'stack', 'backtracking']
+
+def clone(board):
+    # A flat board is copied as a single buffer
+    return bytearray(board) if is_flat(board) else copy.deepcopy(board)
+
+def benchmark(solver, boards, warmup, repeat):
+    for run in range(warmup):
+        for board in boards:
+            solver(clone(board))
+
+    latencies = []
+    totals = []
+
+    for run in range(repeat):
+        total = 0
+        for board in boards:
+            board = clone(board)
+            start_time = time.perf_counter()
+            solver(board)
+            elapsed = time.perf_counter() - start_time
+            latencies.append(elapsed)
+            total += elapsed
+        totals.append(total)
+
+    latencies.sort()
+    totals.sort()
+
+    result = {
+        'puzzles' : len(boards),
+        'runs'    : repeat,
+        'total'   : percentile(totals, 50),
+        'mean'    : sum(latencies) / len(latencies),
+        'median'  : percentile(latencies, 50),
+        'p95'     : percentile(latencies, 95),
+        'p99'     : percentile(latencies, 99),
+        'min'     : latencies[0],
+        'max'     : latencies[-1],
+    }
+
+    return result
+
+def instrument(solver, boards):
+    # One more pass, outside of the timed ones, with the search counters
+    # enabled. Returns the totals over the corpus and the index of the puzzle
+    # that needed the most search nodes.
+
+    total = SearchStats()
+    worst = (-1, 0)
+
+    for i, board in enumerate(boards):
+        stats = SearchStats()
+        solver(clone(board), stats)
+        total.add(stats)
+        worst = max(worst, (stats.nodes, i))
+
+    result = total.as_dict()
+    result['worst'] = {'puzzle': worst[1], 'nodes': worst[0]}
+    return result
+
+def benchmark_batch(boards, count, repeat):
+    from sudoku_solver_numpy import solve_boards
+
+    boards = [boards[i % len(boards)] for i in range(count)]
+    rates = {}
+
+    for name, solve in (('scalar', lambda boards: [solve_sudoku_iterative(board) for board in boards]),
+                        ('numpy', solve_boards)):
+        times = []
+        for run in range(repeat):
+            copies = [clone(board) for board in boards]
+            start_time = time.perf_counter()
+            solve(copies)
+            times.append(time.perf_counter() - start_time)
+        rates[name] = count / percentile(sorted(times), 50)
+
+    return rates
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Sudoku solvers.")
+    parser.add_argument('-s', '--solvers', nargs='+', choices=list(SOLVERS), default=DEFAULT_SOLVERS, help="solvers to run")
+    parser.add_argument('-c', '--corpora', nargs='+', choices=list(CORPORA), default=list(CORPORA), help="puzzle sets to run")
+    parser.add_argument('-w', '--warmup', type=int, default=1, help="untimed passes before timing")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="timed passes")
+    parser.add_argument('-o', '--output', help="write the results as JSON to this file")
+    parser.add_argument('-b', '--baseline', help="compare with the results of a previous JSON file")
+    parser.add_argument('--stats', action='store_true', help="also count search nodes, backtracks and deductions")
+    parser.add_argument('--batch', type=int, metavar='COUNT', help="compare the NumPy batch solver with the scalar one on COUNT puzzles")
+    parser.add_argument('--flat', action='store_true', help="give the puzzles as flat bytearrays")
+    args = parser.parse_args()
+
+    if args.batch:
+        print("%-8s %12s %12s %8s" % ("corpus", "scalar/s", "numpy/s", "speedup"))
+
+        for corpus in args.corpora:
+            boards = [parse_puzzle(line) for line in CORPORA[corpus]]
+            if args.flat:
+                boards = [to_flat(board) for board in boards]
+            rates = benchmark_batch(boards, args.batch, args.repeat)
+            print("%-8s %12.1f %12.1f %7.2fx" % (corpus, rates['scalar'], rates['numpy'], rates['numpy'] / rates['scalar']))
+
+        return
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as fh:
+            for entry in json.load(fh)['results']:
+                baseline[entry['solver'], entry['corpus']] = entry
+
+    results = []
+
+    print("%-26s %-8s %10s %10s %10s %10s %8s" % ("solver", "corpus", "total", "median", "p95", "p99", "change"))
+
+    for corpus in args.corpora:
+        boards = [parse_puzzle(line) for line in CORPORA[corpus]]
+        if args.flat:
+            boards = [to_flat(board) for board in boards]
+
+        for name in args.solvers:
+            result = benchmark(SOLVERS[name], boards, args.warmup, args.repeat)
+            result = dict(solver=name, corpus=corpus, **result)
+            results.append(result)
+
+            if args.stats:
+                result['stats'] = instrument(SOLVERS[name], boards)
+
+            change = ''
+            if (name, corpus) in baseline:
+                change = "%+.1f%%" % (100 * (result['total'] / baseline[name, corpus]['total'] - 1))
+
+            print("%-26s %-8s %10.6f %10.6f %10.6f %10.6f %8s" % (
+                name, corpus, result['total'], result['median'], result['p95'], result['p99'], change))
+
+    if args.stats:
+        print()
+        print("%-26s %-8s %9s %10s %6s %8s %9s %9s %6s" % ("solver", "corpus", "nodes", "backtracks", "depth", "passes", "singles", "elims", "worst"))
+
+        for result in results:
+            stats = result['stats']
+            print("%-26s %-8s %9d %10d %6d %8d %9d %9d %6d" % (
+                result['solver'], result['corpus'], stats['nodes'], stats['backtracks'], stats['max_depth'],
+                stats['passes'], sum(stats['singles'].values()), sum(stats['eliminations'].values()),
+                stats['worst']['puzzle']))
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({
+                'python'   : platform.python_version(),
+                'platform' : platform.platform(),
+                'date'     : time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'warmup'   : args.warmup,
+                'repeat'   : args.repeat,
+                'flat'     : args.flat,
+                'results'  : results,
+            }, fh, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/python
+
+# Sudoku library: one entry point for all the solvers.
+
+# The solvers are registered by name, with the module that implements them:
+#
+#   import sudoku
+#
+#   board = sudoku.parse_puzzle("53..7....6..195....98....6.8...6...34..8.3..17...2...6.6....28....419..5....8..79")
+#   sudoku.solve(board)                        # the iterative solver
+#   sudoku.solve(board, engine='dancing_links')
+#   sudoku.count_solutions(board, limit=2)
+#
+# Importing this module loads none of the solvers: the module of an engine
+# is imported on its first use, so a process pays only for the engines it
+# actually uses (the numpy engine, for example, imports NumPy). A new engine
+# is added with register(name, module), where the module has a
+# solve_sudoku(board) function that solves the board in place and returns it,
+# or a false value when there is no solution. (The recursive solver returns
+# True instead of the board: the functions returned by load() all return the
+# board, or None.)
+
+# Puzzles are written as in sudoku_batch_solver.py: one line of N^4
+# characters, with '0' or '.' for the empty cells and letters for the
+# digits above 9. Anything after the puzzle (e.g. ",solution", or the
+# solution itself, without a comma) is ignored.
+
+# Usage:
+#   python sudoku.py 53..7....6..195....98....6.8...6...34..8.3..17...2...6.6....28....419..5....8..79
+#   python sudoku.py -e dancing_links -g < puzzles.txt
+#   python sudoku.py -u < puzzles.txt
+#   python sudoku.py --list
+
+import importlib
+
+from math import isqrt
+
+from sudoku_board import is_flat
+
+ENGINES = {
+    'iterative'     : 'sudoku_solver_iterative',
+    'recursive'     : 'sudoku_solver_recursive',
+    'stack'         : 'sudoku_solver_stack',
+    'dancing_links' : 'sudoku_solver_dancing_links',
+    'numpy'         : 'sudoku_solver_numpy',
+    'parallel'      : 'sudoku_solver_parallel',
+}
+
+DEFAULT_ENGINE = 'iterative'
+
+NO_SOLUTION    = "No solution exists."
+NOT_UNIQUE     = "No unique solution exists."
+INVALID_PUZZLE = "Invalid puzzle."
+SOLVER_ERROR   = "Solver error."
+
+SYMBOLS = "123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+SOLVERS = {}
+
+def register(name, module):
+    # Register (or replace) an engine, implemented by the named module
+    ENGINES[name] = module
+    SOLVERS.pop(name, None)
+
+def normalised(solver):
+    # The solver, returning the board (instead of True, for the recursive
+    # solver) or None
+    def solve(board, **options):
+        result = solver(board, **options)
+        return board if result is True else result or None
+    return solve
+
+def load(engine=DEFAULT_ENGINE):
+    # The solve_sudoku function of an engine, imported on first use
+    if engine not in SOLVERS:
+        if engine not in ENGINES:
+            raise ValueError("unknown Sudoku engine: %r" % engine)
+        SOLVERS[engine] = normalised(importlib.import_module(ENGINES[engine]).solve_sudoku)
+    return SOLVERS[engine]
+
+def solve(board, engine=DEFAULT_ENGINE, **options):
+
+    # Solve the board in place with the given engine. Returns the board, or
+    # None if the puzzle has no solution. The options (e.g. stats, which all
+    # the engines accept, or processes for the parallel engine) are passed to
+    # the solver.
+
+    return load(engine)(board, **options)
+
+def count_solutions(board, limit=2, processes=1):
+
+    # Count the solutions of the puzzle, up to `limit`, writing the first one
+    # found to the board. With more than one process (or None for all the
+    # cores), the search runs on the parallel engine.
+
+    if processes == 1:
+        module = importlib.import_module(ENGINES['iterative'])
+        return module.count_solutions(board, limit)
+
+    module = importlib.import_module(ENGINES['parallel'])
+    return module.count_solutions(board, limit, processes)
+
+def has_unique_solution(board):
+    return count_solutions(bytearray(board) if is_flat(board) else [list(row) for row in board]) == 1
+
+def parse_puzzle(line):
+    # Anything after a comma or a space is ignored, and so is a solution
+    # written right after the puzzle (2 N^4 characters)
+    cells = line.replace(',', ' ').split()
+    cells = cells[0] if cells else ''
+    n = isqrt(isqrt(len(cells)))
+    if len(cells) == 2 * n**4:
+        cells = cells[:n**4]
+    if n < 2 or len(cells) != n**4:
+        raise ValueError("invalid puzzle: %r" % line)
+    N = n * n
+    # Only the first N symbols are digits of the board
+    try:
+        digits = [0 if c in '.0' else SYMBOLS.index(c.upper(), 0, N) + 1 for c in cells]
+    except ValueError:
+        raise ValueError("invalid puzzle: %r" % line) from None
+    return [digits[N*i : N*i + N] for i in range(N)]
+
+def format_puzzle(board):
+    return ''.join(SYMBOLS[n - 1] if n else '.' for row in board for n in row)
+
+def format_solution(result):
+    if not result or not all(all(row) for row in result):
+        return NO_SOLUTION
+
+    return ''.join(SYMBOLS[n - 1] for row in result for n in row)
+
+def format_grid(board):
+    width = 2 if len(board) > 9 else 1
+    return '\n'.join(' '.join("%*d" % (width, n) for n in row) for row in board)
+
+if __name__ == "__main__":
+
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Solve Sudoku puzzles.")
+    parser.add_argument('puzzles', nargs='*', help="puzzles (default: one per line from stdin)")
+    parser.add_argument('-e', '--engine', choices=sorted(ENGINES), default=DEFAULT_ENGINE, help="solver to use")
+    parser.add_argument('-u', '--unique', action='store_true', help="report the puzzles that have more than one solution")
+    parser.add_argument('-g', '--grid', action='store_true', help="print the solutions as grids")
+    parser.add_argument('-l', '--list', action='store_true', help="list the engines and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for name in sorted(ENGINES):
+            print("%-14s %s" % (name, ENGINES[name]))
+        sys.exit(0)
+
+    lines = args.puzzles or (line.strip() for line in sys.stdin)
+
+    for line in lines:
+        if not line or line.startswith('#'):
+            continue
+
+        try:
+            board = parse_puzzle(line)
+        except ValueError as error:
+            print(error, file=sys.stderr)
+            continue
+
+        if args.unique:
+            count = count_solutions(board)
+            result = board if count == 1 else None
+            if count > 1:
+                print(NOT_UNIQUE)
+                continue
+        else:
+            result = solve(board, args.engine)
+
+        if result and args.grid:
+            print(format_grid(result))
+            print()
+        else:
+            print(format_solution(result))
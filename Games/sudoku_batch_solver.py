@@ -0,0 +1,209 @@
+#!/usr/bin/python
+
+# Solve a stream of Sudoku puzzles with a pool of worker processes.
+
+# Puzzles are read from a file (or stdin) in the common one-per-line format:
+# 81 characters in row-major order, with '0' or '.' for the empty cells.
+# Anything after the puzzle (e.g. ",solution", or the solution itself, with
+# no comma) is ignored, as are empty lines and lines starting with '#'.
+
+# Larger boards are given the same way, with N^4 characters for an N^2 x N^2
+# board (256 for 16x16, 625 for 25x25) and the digits above 9 written as
+# letters (A = 10, B = 11, ...).
+
+# A line that is not a valid puzzle gets "Invalid puzzle." as its output
+# line (and a solver failing on a puzzle, "Solver error."), so that one bad
+# line does not stop the run and the output stays aligned with the input.
+
+# The input is read lazily and split into chunks that are solved by the worker
+# processes. At most a few chunks per worker are in flight at any time, so the
+# memory usage does not depend on the size of the input, and the solutions are
+# written back in the same order as the puzzles.
+
+# With --unique the puzzles are also validated: those with more than one
+# solution are reported as such, instead of with one of their solutions.
+# The solutions are then counted (up to 2) by the iterative engine, whatever
+# the engine chosen.
+
+# The numpy engine (which requires NumPy) solves every chunk as one batch,
+# propagating all its puzzles at once.
+
+# With --cache every process keeps a cache of the solutions, shared by the
+# puzzles that are equivalent under symmetry (see sudoku_cache.py), so that
+# repeated puzzles are not solved again. With --cache-file the cache is
+# loaded from that file, and saved back to it when a single process is used.
+# The hits and misses of every chunk are sent back with its solutions, and
+# the hit rate over all the processes is reported at the end.
+
+# Usage:
+#   python sudoku_batch_solver.py puzzles.txt > solutions.txt
+#   python sudoku_batch_solver.py -e dancing_links -j 8 < puzzles.txt
+#   python sudoku_batch_solver.py --unique < puzzles.txt
+#   python sudoku_batch_solver.py -j 1 --cache 100000 --cache-file cache.json < puzzles.txt
+
+import argparse
+import importlib
+import multiprocessing
+import sys
+import time
+
+from collections import deque
+from itertools import islice
+
+from sudoku import ENGINES as ALL_ENGINES, NOT_UNIQUE, INVALID_PUZZLE, SOLVER_ERROR, load, parse_puzzle, format_solution
+
+# The parallel engine runs its own pool of processes, and is not used here
+ENGINES = {name: module for name, module in ALL_ENGINES.items() if name != 'parallel'}
+
+solver  = None
+batch   = None
+counter = None
+cache   = None
+
+def load_engine(engine, unique=False, cache_size=0, cache_file=None):
+    global solver, batch, counter, cache
+    solver = load(engine)
+    batch  = getattr(importlib.import_module(ENGINES[engine]), 'solve_boards', None)
+    if unique:
+        counter = importlib.import_module(ENGINES['iterative']).count_solutions
+    if cache_size:
+        from sudoku_cache import SolutionCache
+        cache = SolutionCache(cache_size, cache_file)
+
+def solve_puzzle(line):
+    try:
+        board = parse_puzzle(line)
+    except ValueError:
+        return INVALID_PUZZLE
+
+    try:
+        return solve_board(board)
+    except Exception as error:
+        print("solver error on %r: %r" % (line, error), file=sys.stderr)
+        return SOLVER_ERROR
+
+def solve_board(board):
+    if counter is not None:
+        count = counter(board, 2)
+        if count > 1:
+            return NOT_UNIQUE
+        result = board if count else None
+    elif cache is not None:
+        result = cache.solve(board, solver)
+    else:
+        result = solver(board)
+
+    return format_solution(result)
+
+def solve_chunk(lines):
+    if batch is None or counter is not None or cache is not None:
+        return [solve_puzzle(line) for line in lines]
+
+    boards = []
+    for line in lines:
+        try:
+            boards.append(parse_puzzle(line))
+        except ValueError:
+            boards.append(None)
+
+    # On a failure of the batch, every puzzle is solved on its own, to find
+    # the one that fails
+    try:
+        results = iter(batch([board for board in boards if board is not None]))
+    except Exception:
+        return [solve_puzzle(line) for line in lines]
+
+    return [INVALID_PUZZLE if board is None else format_solution(next(results)) for board in boards]
+
+def run_chunk(lines):
+    # The solutions of a chunk, with the cache hits and misses it made
+    if cache is None:
+        return solve_chunk(lines), 0, 0
+    hits, misses = cache.hits, cache.misses
+    solutions = solve_chunk(lines)
+    return solutions, cache.hits - hits, cache.misses - misses
+
+def read_puzzles(fh):
+    for line in fh:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def solve_stream(fh, out, engine='iterative', processes=None, chunk_size=256, unique=False,
+                 cache_size=0, cache_file=None):
+
+    # Returns the number of puzzles, and the cache hits and misses (summed
+    # over all the processes)
+
+    processes = processes or multiprocessing.cpu_count()
+    totals = [0, 0, 0]
+
+    def write(result):
+        solutions, hits, misses = result
+        out.write(''.join(s + '\n' for s in solutions))
+        totals[0] += len(solutions)
+        totals[1] += hits
+        totals[2] += misses
+
+    if processes == 1:
+        load_engine(engine, unique, cache_size, cache_file)
+        for chunk in chunks(read_puzzles(fh), chunk_size):
+            write(run_chunk(chunk))
+        if cache is not None and cache_file is not None:
+            cache.save()
+        return tuple(totals)
+
+    with multiprocessing.Pool(processes, initializer=load_engine,
+                              initargs=(engine, unique, cache_size, cache_file)) as pool:
+        pending = deque()
+
+        for chunk in chunks(read_puzzles(fh), chunk_size):
+
+            # Wait for the oldest chunk when too many are in flight
+            if len(pending) >= 2 * processes:
+                write(pending.popleft().get())
+
+            pending.append(pool.apply_async(run_chunk, (chunk,)))
+
+        while pending:
+            write(pending.popleft().get())
+
+    return tuple(totals)
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Solve Sudoku puzzles given one per line.")
+    parser.add_argument('input', nargs='?', default='-', help="puzzle file (default: stdin)")
+    parser.add_argument('-o', '--output', default='-', help="solution file (default: stdout)")
+    parser.add_argument('-e', '--engine', choices=sorted(ENGINES), default='iterative', help="solver to use")
+    parser.add_argument('-j', '--processes', type=int, default=None, help="number of worker processes")
+    parser.add_argument('-c', '--chunk-size', type=int, default=256, help="puzzles per task")
+    parser.add_argument('-u', '--unique', action='store_true', help="report the puzzles that have more than one solution")
+    parser.add_argument('--cache', type=int, default=0, metavar='SIZE', help="cache up to SIZE solutions per process")
+    parser.add_argument('--cache-file', default=None, help="file to load the cache from (and save it to, with -j 1)")
+    args = parser.parse_args()
+
+    fh  = sys.stdin  if args.input  == '-' else open(args.input)
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+
+    start_time = time.perf_counter()
+    count, hits, misses = solve_stream(fh, out, args.engine, args.processes, args.chunk_size, args.unique,
+                         args.cache, args.cache_file)
+    elapsed = time.perf_counter() - start_time
+
+    out.flush()
+
+    print("Processed %d puzzles in %.3f seconds (%.1f puzzles/second)"
+          % (count, elapsed, count / elapsed if elapsed else 0), file=sys.stderr)
+
+    if args.cache:
+        print("Cache: %d hits, %d misses (%.1f%% hit rate)"
+              % (hits, misses, 100 * hits / (hits + misses) if hits + misses else 0), file=sys.stderr)
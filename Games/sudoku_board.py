@@ -0,0 +1,661 @@
+#!/usr/bin/python
+
+# Bitmask board state shared by the Sudoku solvers.
+
+# Every row, column and box keeps a mask of the digits already placed in
+# it (bit n-1 is set when digit n is present). The masks are updated
+# incrementally by place() and unplace(), so the candidates of a cell are
+# given by a single OR of three masks, instead of scanning the cells of its
+# row, column and box for every digit tried.
+
+# Boards of any size N = n^2 are supported (9x9, 16x16, 25x25, ...), with
+# n x n boxes. The size is taken from the board itself and all the tables
+# that depend on it are computed once per size, by geometry().
+
+# A board is either a list of N rows (lists of N digits, with 0 for the
+# empty cells), or a flat buffer of N^2 bytes in row-major order: a
+# bytearray, an array('B') or a writable memoryview, e.g. a slice of a larger
+# buffer holding many puzzles. A flat board is solved in place, through
+# memoryview rows from board_rows(), without copying it to Python lists.
+
+import time
+
+from array import array
+
+from collections import Counter
+from math import isqrt
+
+class MaskDigits:
+
+    # Stands in for the digits table, of 2^N entries, on boards larger than 9x9
+
+    def __getitem__(self, mask):
+        digits = []
+        while mask:
+            bit = mask & -mask
+            digits.append(bit.bit_length())
+            mask ^= bit
+        return digits
+
+class MaskPopcount:
+
+    # Stands in for the popcount table, of 2^N entries, on boards larger than 9x9
+
+    def __getitem__(self, mask):
+        return bin(mask).count('1')
+
+class Geometry:
+
+    # Lookup tables for an N x N board made of n x n boxes. Cells are also
+    # numbered by their flat index N*row + col.
+
+    def __init__(self, n):
+        N = n * n
+
+        self.box_size   = n
+        self.size       = N
+        self.cells      = N * N
+        self.all_digits = (1 << N) - 1
+
+        # Digits in a candidate mask and their number
+        if N <= 9:
+            self.digits   = [[d for d in range(1, N + 1) if mask & (1 << (d - 1))] for mask in range(1 << N)]
+            self.popcount = [len(digits) for digits in self.digits]
+        else:
+            self.digits   = MaskDigits()
+            self.popcount = MaskPopcount()
+
+        # Index of the box containing each cell
+        self.box = [[n * (i // n) + j // n for j in range(N)] for i in range(N)]
+
+        # The units (N rows, N columns and N boxes), as lists of flat cell indices
+        self.units = ([[N*i + j for j in range(N)] for i in range(N)] +
+                      [[N*i + j for i in range(N)] for j in range(N)] +
+                      [[N*(n*(b//n) + k//n) + n*(b%n) + k%n for k in range(N)] for b in range(N)])
+
+        # The row, column and box unit of each cell
+        self.cell_units = [(i, N + j, 2*N + self.box[i][j]) for i in range(N) for j in range(N)]
+
+        # The peers (cells sharing a row, column or box) of each cell
+        self.peers = [
+            sorted(set().union(*(self.units[u] for u in self.cell_units[cell])) - {cell})
+            for cell in range(N * N)
+        ]
+
+        # Positions in a unit (bit k for its k-th cell) of the n rows of a box,
+        # of the n columns of a box, and of the n box segments of a line
+        box_rows = [((1 << n) - 1) << n*k for k in range(n)]
+        box_cols = [sum(1 << n*r for r in range(n)) << k for k in range(n)]
+        segments = box_rows
+
+        # For each unit, the units crossing it in n cells: for a box, its n
+        # rows and n columns; for a row or a column, the n boxes it meets
+        self.crossing = ([[(segments[k], 2*N + self.box[i][n*k]) for k in range(n)] for i in range(N)] +
+                         [[(segments[k], 2*N + self.box[n*k][j]) for k in range(n)] for j in range(N)] +
+                         [[(box_rows[k], n*(b//n) + k) for k in range(n)] +
+                          [(box_cols[k], N + n*(b%n) + k) for k in range(n)] for b in range(N)])
+
+GEOMETRIES = {}
+
+def geometry(size):
+    # Tables for boards with `size` rows, built on first use
+    if size not in GEOMETRIES:
+        n = isqrt(size)
+        if n < 2 or n * n != size:
+            raise ValueError("invalid Sudoku size: %d" % size)
+        GEOMETRIES[size] = Geometry(n)
+    return GEOMETRIES[size]
+
+FLAT_TYPES = (bytearray, memoryview, array)
+
+def is_flat(board):
+    return isinstance(board, FLAT_TYPES)
+
+def board_rows(board):
+    # The rows of a board: the board itself if it is a list of rows, or
+    # writable views of the rows of a flat buffer
+    if not is_flat(board):
+        return board
+    view = memoryview(board).cast('B')
+    N = isqrt(len(view))
+    if N * N != len(view):
+        raise ValueError("invalid Sudoku board: %d cells" % len(view))
+    return [view[N*i : N*i + N] for i in range(N)]
+
+def to_flat(board):
+    # A list of rows as a flat buffer
+    return bytearray(n for row in board for n in row)
+
+def to_rows(board):
+    # A flat buffer as a list of rows
+    return [list(row) for row in board_rows(board)]
+
+class BoardState:
+
+    def __init__(self, board):
+        board = board_rows(board)
+
+        self.geo   = geo = geometry(len(board))
+        self.size  = N = geo.size
+        self.box   = geo.box
+        self.all_digits = geo.all_digits
+
+        self.board = board
+        self.rows  = [0] * N
+        self.cols  = [0] * N
+        self.boxes = [0] * N
+
+        for i in range(N):
+            for j in range(N):
+                if board[i][j]:
+                    self.place(i, j, board[i][j])
+
+    def place(self, row, col, num):
+        bit = 1 << (num - 1)
+        self.board[row][col] = num
+        self.rows[row] |= bit
+        self.cols[col] |= bit
+        self.boxes[self.box[row][col]] |= bit
+
+    def unplace(self, row, col):
+        bit = ~(1 << (self.board[row][col] - 1))
+        self.board[row][col] = 0
+        self.rows[row] &= bit
+        self.cols[col] &= bit
+        self.boxes[self.box[row][col]] &= bit
+
+    def candidates(self, row, col):
+        # Mask of the digits that can still be placed at (row, col)
+        return self.all_digits & ~(self.rows[row] | self.cols[col] | self.boxes[self.box[row][col]])
+
+    def is_valid(self, row, col, num):
+        return (self.candidates(row, col) >> (num - 1)) & 1 == 1
+
+    def empty_locations(self):
+        # All empty positions (cells with 0), in row-major order
+        N = self.size
+        return [(i, j) for i in range(N) for j in range(N) if self.board[i][j] == 0]
+
+class CountedBoardState(BoardState):
+
+    # Board state that also keeps, for every empty cell, the number of its
+    # candidates and the number of its empty peers (its degree), and for
+    # every unit and digit not yet placed in it, the number of cells of the
+    # unit where the digit can still go. These counts are updated only for
+    # the cell being placed or unplaced and for its peers. Empty cells and
+    # digit placements are kept in buckets by count, so the most constrained
+    # choice is found without scanning the whole board.
+
+    def __init__(self, board):
+        board = board_rows(board)
+
+        geo = geometry(len(board))
+        N   = geo.size
+
+        self.peers      = geo.peers
+        self.units      = geo.units
+        self.cell_units = geo.cell_units
+        self.counts     = [N] * geo.cells
+        self.degrees    = [len(geo.peers[0])] * geo.cells
+        self.buckets    = [set() for n in range(N + 1)]
+        self.buckets[N].update(range(geo.cells))
+
+        # Placements are numbered N*unit + digit - 1
+        self.places        = [N] * (3 * N * N)
+        self.done          = [False] * (3 * N * N)
+        self.place_buckets = [set() for n in range(N + 1)]
+        self.place_buckets[N].update(range(3 * N * N))
+
+        # The clues are placed one by one through place(), starting from an empty board
+        clues = [(i, j, board[i][j]) for i in range(N) for j in range(N) if board[i][j]]
+
+        for i, j, num in clues:
+            board[i][j] = 0
+
+        BoardState.__init__(self, board)
+
+        self.valid = True
+        for i, j, num in clues:
+            if not self.is_valid(i, j, num):
+                self.valid = False  # the clues repeat a digit
+            self.place(i, j, num)
+
+    def update_place(self, k, delta):
+        if not self.done[k]:
+            self.place_buckets[self.places[k]].discard(k)
+            self.place_buckets[self.places[k] + delta].add(k)
+        self.places[k] += delta
+
+    def place(self, row, col, num):
+        N       = self.size
+        bit     = 1 << (num - 1)
+        cell    = N*row + col
+        units   = self.cell_units[cell]
+        board   = self.board
+        counts  = self.counts
+        buckets = self.buckets
+        degrees = self.degrees
+
+        # The digit is now placed in the units of the cell
+        for u in units:
+            k = N*u + num - 1
+            self.done[k] = True
+            self.place_buckets[self.places[k]].discard(k)
+
+        # The cell is no longer a place for any of its candidates
+        buckets[counts[cell]].discard(cell)
+
+        for n in self.geo.digits[self.candidates(row, col)]:
+            for u in units:
+                self.update_place(N*u + n - 1, -1)
+
+        # And the digit is no longer a candidate of its empty peers
+        for p in self.peers[cell]:
+            degrees[p] -= 1
+            r, c = divmod(p, N)
+            if board[r][c] == 0 and self.candidates(r, c) & bit:
+                buckets[counts[p]].discard(p)
+                counts[p] -= 1
+                buckets[counts[p]].add(p)
+                for u in self.cell_units[p]:
+                    self.update_place(N*u + num - 1, -1)
+
+        BoardState.place(self, row, col, num)
+
+    def unplace(self, row, col):
+        N       = self.size
+        num     = self.board[row][col]
+        bit     = 1 << (num - 1)
+        cell    = N*row + col
+        units   = self.cell_units[cell]
+        board   = self.board
+        counts  = self.counts
+        buckets = self.buckets
+        degrees = self.degrees
+
+        BoardState.unplace(self, row, col)
+
+        for p in self.peers[cell]:
+            degrees[p] += 1
+            r, c = divmod(p, N)
+            if board[r][c] == 0 and self.candidates(r, c) & bit:
+                buckets[counts[p]].discard(p)
+                counts[p] += 1
+                buckets[counts[p]].add(p)
+                for u in self.cell_units[p]:
+                    self.update_place(N*u + num - 1, +1)
+
+        for n in self.geo.digits[self.candidates(row, col)]:
+            for u in units:
+                self.update_place(N*u + n - 1, +1)
+
+        counts[cell] = self.geo.popcount[self.candidates(row, col)]
+        buckets[counts[cell]].add(cell)
+
+        for u in units:
+            k = N*u + num - 1
+            self.done[k] = False
+            self.place_buckets[self.places[k]].add(k)
+
+    def most_constrained(self):
+        # The empty cell with the fewest candidates, breaking ties by the
+        # largest number of empty peers, or (None, None) if the board is filled
+        for bucket in self.buckets:
+            if bucket:
+                return divmod(max(bucket, key=self.degrees.__getitem__), self.size)
+        return None, None
+
+    def choices(self):
+        # The moves (row, col, num) to branch on, one of which must be made:
+        # the candidates of the most constrained empty cell, or the places of
+        # a digit in a unit when it has fewer of them. Returns None if the
+        # board is filled, and an empty list on a dead end.
+
+        N = self.size
+        row, col = self.most_constrained()
+
+        if row is None and col is None:
+            return None
+
+        count = self.counts[N*row + col]
+
+        for places in range(count):
+            if self.place_buckets[places]:
+                k = next(iter(self.place_buckets[places]))
+                u, n = divmod(k, N)
+                bit = 1 << n
+                return [(*divmod(p, N), n + 1) for p in self.units[u]
+                        if self.board[p // N][p % N] == 0 and self.candidates(*divmod(p, N)) & bit]
+
+        return [(row, col, num) for num in self.geo.digits[self.candidates(row, col)]]
+
+class CandidateGrid:
+
+    # Candidate masks of all the cells, kept across propagation passes.
+    #
+    # Placing a digit removes it only from the candidates of the peers of
+    # the cell, and every cell whose candidates change marks its three units
+    # as dirty. The deductions that look at a whole unit (hidden singles,
+    # naked and hidden pairs, pointing pairs and box/line reduction) are then
+    # applied only to the dirty units, so each pass is proportional to what
+    # changed since the previous one.
+    #
+    # As in CountedBoardState, the empty cells are kept in buckets by number
+    # of candidates, along with their number of empty peers (their degree),
+    # both updated by assign() and eliminate(), so the cell to branch on is
+    # found without scanning the whole grid.
+
+    def __init__(self, board, stats=None):
+        if is_flat(board):
+            self.geo    = geo = geometry(isqrt(len(board)))
+            self.values = list(board)
+        else:
+            self.geo    = geo = geometry(len(board))
+            self.values = [n for row in board for n in row]
+
+        self.stats    = stats
+        self.cands    = [0] * geo.cells
+        self.queue    = []
+        self.dirty    = list(range(3 * geo.size))
+        self.is_dirty = [True] * (3 * geo.size)
+        self.empty    = 0
+        self.changes  = 0
+        self.valid    = True
+        self.counts   = [0] * geo.cells
+        self.buckets  = [set() for n in range(geo.size + 1)]
+        self.degrees  = [0] * geo.cells
+
+        cell_units = geo.cell_units
+
+        used = [0] * (3 * geo.size)
+        for cell in range(geo.cells):
+            if self.values[cell]:
+                bit = 1 << (self.values[cell] - 1)
+                for u in cell_units[cell]:
+                    if used[u] & bit:
+                        self.valid = False  # the clues repeat a digit
+                    used[u] |= bit
+
+        for cell in range(geo.cells):
+            if self.values[cell] == 0:
+                r, c, b = cell_units[cell]
+                self.cands[cell] = geo.all_digits & ~(used[r] | used[c] | used[b])
+                self.empty += 1
+                count = self.counts[cell] = geo.popcount[self.cands[cell]]
+                self.buckets[count].add(cell)
+                if count <= 1:
+                    self.queue.append(cell)
+                for p in geo.peers[cell]:
+                    self.degrees[p] += 1
+
+    def copy(self):
+        grid = CandidateGrid.__new__(CandidateGrid)
+        grid.__dict__.update(self.__dict__)
+        grid.values   = self.values[:]
+        grid.cands    = self.cands[:]
+        grid.queue    = self.queue[:]
+        grid.dirty    = self.dirty[:]
+        grid.is_dirty = self.is_dirty[:]
+        grid.counts   = self.counts[:]
+        grid.buckets  = [bucket.copy() for bucket in self.buckets]
+        grid.degrees  = self.degrees[:]
+        return grid
+
+    def write(self, board):
+        # Copy the values of the cells to the board
+        if is_flat(board):
+            memoryview(board).cast('B')[:] = bytes(self.values)
+            return
+        N = self.geo.size
+        for i in range(N):
+            board[i][:] = self.values[N*i : N*i + N]
+
+    def most_constrained(self):
+        # The empty cell with the fewest candidates, breaking ties by the
+        # largest number of empty peers, or None if the grid is filled
+        for bucket in self.buckets[1:]:
+            if bucket:
+                return max(bucket, key=self.degrees.__getitem__)
+        return None
+
+    def mark_dirty(self, cell):
+        for u in self.geo.cell_units[cell]:
+            if not self.is_dirty[u]:
+                self.is_dirty[u] = True
+                self.dirty.append(u)
+
+    def assign(self, cell, num):
+        bit = 1 << (num - 1)
+
+        if not self.cands[cell] & bit:
+            return False
+
+        self.buckets[self.counts[cell]].discard(cell)
+        self.values[cell] = num
+        self.cands[cell] = 0
+        self.empty -= 1
+        self.changes += 1
+        self.mark_dirty(cell)
+
+        degrees = self.degrees
+        for p in self.geo.peers[cell]:
+            degrees[p] -= 1
+            if not self.eliminate(p, bit):
+                return False
+
+        return True
+
+    def eliminate(self, cell, mask):
+        # Remove the digits of the mask from the candidates of an empty cell
+        cands = self.cands
+        if not cands[cell] & mask:
+            return True
+
+        # Most eliminations remove a single digit, which needs no popcount
+        removed = cands[cell] & mask
+        counts  = self.counts
+        self.buckets[counts[cell]].discard(cell)
+        counts[cell] -= 1 if removed & (removed - 1) == 0 else self.geo.popcount[removed]
+        self.buckets[counts[cell]].add(cell)
+
+        cands[cell] &= ~mask
+        self.changes += 1
+        self.mark_dirty(cell)
+
+        if cands[cell] & (cands[cell] - 1) == 0:
+            if cands[cell] == 0:
+                return False
+            self.queue.append(cell)
+
+        return True
+
+    def check_unit(self, u):
+        # Apply the deductions of a unit until the first one that makes
+        # progress. Returns False on a contradiction.
+
+        geo      = self.geo
+        unit     = geo.units[u]
+        digits   = geo.digits
+        popcount = geo.popcount
+        cands    = self.cands
+        values   = self.values
+
+        # Positions in the unit where each digit can still go
+        where  = [0] * (geo.size + 1)
+        placed = 0
+        for k, cell in enumerate(unit):
+            if values[cell]:
+                placed |= 1 << (values[cell] - 1)
+            else:
+                for n in digits[cands[cell]]:
+                    where[n] |= 1 << k
+
+        missing = digits[geo.all_digits & ~placed]
+        changes = self.changes
+
+        # Hidden singles
+        for n in missing:
+            count = popcount[where[n]]
+            if count == 0:
+                return False  # the digit has nowhere to go
+            if count == 1:
+                if self.stats is not None:
+                    self.stats.singles['hidden'] += 1
+                return self.assign(unit[where[n].bit_length() - 1], n)
+
+        # Naked pairs: two cells with the same two candidates
+        pairs = {}
+        for cell in unit:
+            mask = cands[cell]
+            if popcount[mask] == 2:
+                if mask in pairs:
+                    for other in unit:
+                        if other != cell and other != pairs[mask] and not self.eliminate(other, mask):
+                            return False
+                    if self.changes != changes:
+                        if self.stats is not None:
+                            self.stats.eliminations['naked pair'] += 1
+                        return True
+                else:
+                    pairs[mask] = cell
+
+        # Hidden pairs: two digits that can only go in the same two cells
+        pairs = {}
+        for n in missing:
+            if popcount[where[n]] == 2:
+                if where[n] in pairs:
+                    mask = (1 << (n - 1)) | (1 << (pairs[where[n]] - 1))
+                    for k in range(geo.size):
+                        if where[n] >> k & 1:
+                            self.eliminate(unit[k], geo.all_digits & ~mask)
+                    if self.changes != changes:
+                        if self.stats is not None:
+                            self.stats.eliminations['hidden pair'] += 1
+                        return True
+                else:
+                    pairs[where[n]] = n
+
+        # Pointing pairs (in a box) and box/line reduction (in a row or a column):
+        # a digit confined to the cells shared with a crossing unit is removed
+        # from the rest of that unit
+        for n in missing:
+            bit = 1 << (n - 1)
+            for positions, v in geo.crossing[u]:
+                if where[n] & ~positions == 0:
+                    for cell in geo.units[v]:
+                        if cell not in unit and not self.eliminate(cell, bit):
+                            return False
+            if self.changes != changes:
+                if self.stats is not None:
+                    self.stats.eliminations['pointing' if u >= 2 * geo.size else 'box/line'] += 1
+                return True
+
+        return True
+
+    def propagate(self):
+        # Apply the deductions until none of them makes progress.
+        # Returns False if the puzzle is found to have no solution.
+
+        if not self.valid:
+            return False
+
+        queue  = self.queue
+        dirty  = self.dirty
+        values = self.values
+        cands  = self.cands
+        stats  = self.stats
+
+        if stats is not None:
+            stats.passes += 1
+
+        while True:
+
+            # Naked singles
+            while queue:
+                cell = queue.pop()
+                if values[cell] == 0:
+                    if cands[cell] == 0:
+                        return False
+                    if stats is not None:
+                        stats.singles['naked'] += 1
+                    if not self.assign(cell, cands[cell].bit_length()):
+                        return False
+
+            if not dirty:
+                return True
+
+            u = dirty.pop()
+            self.is_dirty[u] = False
+
+            if not self.check_unit(u):
+                return False
+
+def percentile(values, p):
+    # Nearest-rank percentile of a sorted list
+    k = max(0, -(-len(values) * p // 100) - 1)
+    return values[int(k)]
+
+class SearchStats:
+
+    # Counters of a solver run, filled in when a solver is given one as its
+    # stats argument. Without it (stats=None) the solvers do no bookkeeping
+    # beyond testing for None at the points where something is counted.
+    #
+    #   nodes         positions tried by the search (guesses)
+    #   backtracks    guesses undone because they led to a contradiction
+    #   max_depth     deepest level of guesses
+    #   passes        calls of the propagation loop
+    #   singles       digits placed by propagation, by rule (naked, hidden)
+    #   eliminations  deductions of the other rules that removed candidates
+    #   times         seconds spent in each phase (setup, propagate, search)
+    #
+    # The counters of several runs are summed with add(), e.g. over a batch.
+
+    def __init__(self):
+        self.solves       = 0
+        self.nodes        = 0
+        self.backtracks   = 0
+        self.max_depth    = 0
+        self.passes       = 0
+        self.singles      = Counter()
+        self.eliminations = Counter()
+        self.times        = Counter()
+        self.clock        = None
+
+    def start(self):
+        self.solves += 1
+        self.clock = time.perf_counter()
+
+    def lap(self, phase):
+        # Charge the time since the previous lap (or start) to a phase
+        now = time.perf_counter()
+        self.times[phase] += now - self.clock
+        self.clock = now
+
+    def enter(self, depth):
+        self.nodes += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def add(self, other):
+        self.solves       += other.solves
+        self.nodes        += other.nodes
+        self.backtracks   += other.backtracks
+        self.max_depth     = max(self.max_depth, other.max_depth)
+        self.passes       += other.passes
+        self.singles      += other.singles
+        self.eliminations += other.eliminations
+        self.times        += other.times
+        return self
+
+    def as_dict(self):
+        return {
+            'solves'       : self.solves,
+            'nodes'        : self.nodes,
+            'backtracks'   : self.backtracks,
+            'max_depth'    : self.max_depth,
+            'passes'       : self.passes,
+            'singles'      : dict(self.singles),
+            'eliminations' : dict(self.eliminations),
+            'times'        : dict(self.times),
+        }
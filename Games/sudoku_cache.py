@@ -0,0 +1,283 @@
+#!/usr/bin/python
+
+# Cache of Sudoku solutions, shared by the puzzles equivalent under symmetry.
+
+# Two puzzles are equivalent when one is obtained from the other by:
+#   relabelling the digits
+#   permuting the rows inside a band, or the columns inside a stack
+#   permuting the bands, or the stacks
+#   transposing the board
+# and their solutions are then obtained from each other by the same transform.
+
+# Every puzzle is first brought to a canonical form, which is the cache key:
+# the rows and the columns are ordered by invariants that these transforms
+# preserve (number of clues, spread of the clues over the stacks and bands,
+# refined by the invariants of the crossing lines), and the digits are
+# relabelled in order of first appearance. When some rows or columns have
+# the same invariants, all their orders are tried (up to MAX_ORDERS of them)
+# and the lexicographically smallest form is kept.
+#
+# The canonical puzzle is solved once and its solution is stored. On a hit,
+# the stored solution is mapped back through the inverse transform, so a
+# repeated puzzle costs a canonicalisation instead of a search. Puzzles
+# with too many symmetric orders may miss some equivalent entries, but the
+# mapping back is always exact, as it uses the transform actually applied.
+
+# Flat boards (see sudoku_board.py) are read through their rows, and the
+# solution is written back to the buffer.
+
+# The cache keeps at most `maxsize` entries, evicting the least recently used
+# ones, and can be saved to and loaded from a JSON file.
+
+import json
+import os
+
+from collections import OrderedDict
+from itertools import islice, permutations, product
+from math import isqrt
+
+from sudoku_board import is_flat, to_rows, to_flat
+
+MAX_ORDERS = 64
+
+def ranks(values):
+    # Replace each value by its rank among the distinct values
+    index = {v: k for k, v in enumerate(sorted(set(values)))}
+    return [index[v] for v in values]
+
+def line_invariants(grid, n):
+
+    # Invariants of the rows and of the columns, as integers
+
+    N = n * n
+    rows = [[j for j in range(N) if grid[i][j]] for i in range(N)]
+    cols = [[i for i in range(N) if grid[i][j]] for j in range(N)]
+
+    def spread(line):
+        # Number of clues in every stack (or band), sorted
+        counts = [0] * n
+        for k in line:
+            counts[k // n] += 1
+        return tuple(sorted(counts))
+
+    # Number of clues, and their spread over the stacks (or bands)
+    row_inv = ranks([(len(r), spread(r)) for r in rows])
+    col_inv = ranks([(len(c), spread(c)) for c in cols])
+
+    # Refined by the invariants of the lines crossing them at a clue
+    for step in range(2):
+        row_inv, col_inv = (
+            ranks([(row_inv[i], tuple(sorted(col_inv[j] for j in rows[i]))) for i in range(N)]),
+            ranks([(col_inv[j], tuple(sorted(row_inv[i] for i in cols[j]))) for j in range(N)]),
+        )
+
+    return row_inv, col_inv
+
+def line_orders(inv, n):
+
+    # The orders of the lines (rows or columns) sorted by their invariants,
+    # with every order of the bands and lines that have the same invariants
+
+    N = n * n
+    bands = sorted(range(n), key=lambda b: sorted(inv[n*b : n*b + n]))
+
+    def groups(items, key):
+        # Permutations of every run of items with the same key
+        runs = []
+        for item in items:
+            if runs and key(runs[-1][0]) == key(item):
+                runs[-1].append(item)
+            else:
+                runs.append([item])
+        return [list(permutations(run)) for run in runs]
+
+    band_orders = product(*groups(bands, lambda b: sorted(inv[n*b : n*b + n])))
+
+    orders = []
+    for band_order in band_orders:
+        band_order = [b for run in band_order for b in run]
+        lines = [groups(sorted(range(n*b, n*b + n), key=lambda i: inv[i]), lambda i: inv[i]) for b in band_order]
+        for choice in islice(product(*[product(*runs) for runs in lines]), MAX_ORDERS):
+            orders.append([i for band in choice for run in band for i in run])
+            if len(orders) >= MAX_ORDERS:
+                return orders
+
+    return orders
+
+def canonical_form(board):
+
+    # Returns the canonical form of the puzzle, as a tuple of N^2 labels
+    # (0 for the empty cells), with the transform that gives it:
+    # (transposed, row order, column order, digit -> label)
+
+    N = len(board)
+    n = isqrt(N)
+
+    best = None
+
+    for transposed in (False, True):
+        grid = [list(col) for col in zip(*board)] if transposed else board
+        row_inv, col_inv = line_invariants(grid, n)
+        col_orders = line_orders(col_inv, n)
+
+        for rows in line_orders(row_inv, n):
+            for cols in col_orders:
+                labels = {}
+                form = []
+
+                for i in rows:
+                    row = grid[i]
+                    for j in cols:
+                        d = row[j]
+                        if d:
+                            if d not in labels:
+                                labels[d] = len(labels) + 1
+                            form.append(labels[d])
+                        else:
+                            form.append(0)
+
+                    # Stop as soon as the form gets larger than the best one
+                    if best is not None and form > best[0][:len(form)]:
+                        break
+                else:
+                    if best is None or form < best[0]:
+                        best = (form, (transposed, rows, cols, labels))
+
+    return tuple(best[0]), best[1]
+
+def from_canonical(solution, transform):
+
+    # Map the solution of the canonical puzzle (a tuple of N^2 labels)
+    # back to a solution of the original puzzle
+
+    transposed, rows, cols, labels = transform
+    N = len(rows)
+
+    # The digits missing from the clues get the remaining labels
+    digits = {k: d for d, k in labels.items()}
+    missing = [d for d in range(1, N + 1) if d not in labels]
+    for k, d in zip(range(len(labels) + 1, N + 1), missing):
+        digits[k] = d
+
+    board = [[0] * N for i in range(N)]
+    for a, i in enumerate(rows):
+        for b, j in enumerate(cols):
+            board[i][j] = digits[solution[N*a + b]]
+
+    if transposed:
+        board = [list(col) for col in zip(*board)]
+
+    return board
+
+class SolutionCache:
+
+    def __init__(self, maxsize=100000, path=None):
+        self.maxsize = maxsize
+        self.path    = path
+        self.entries = OrderedDict()
+        self.hits    = 0
+        self.misses  = 0
+
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def solve(self, board, solver):
+
+        # Solve the puzzle in place with the cache, calling solver(board)
+        # on a miss. Returns the board, or None if it has no solution.
+
+        rows = to_rows(board) if is_flat(board) else board
+        N = len(rows)
+
+        form, transform = canonical_form(rows)
+        key = ''.join(map(str, form)) if N <= 9 else ','.join(map(str, form))
+
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            solution = self.entries[key]
+        else:
+            self.misses += 1
+            canonical = [list(form[N*i : N*i + N]) for i in range(N)]
+
+            # Solved in place
+            solution = tuple(n for row in canonical for n in row) if solver(canonical) else None
+
+            self.entries[key] = solution
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+        if solution is None:
+            return None
+
+        solved = from_canonical(solution, transform)
+
+        if is_flat(board):
+            memoryview(board).cast('B')[:] = to_flat(solved)
+        else:
+            board[:] = solved
+
+        return board
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            'size'     : len(self.entries),
+            'hits'     : self.hits,
+            'misses'   : self.misses,
+            'hit_rate' : self.hit_rate(),
+        }
+
+    def load(self, path):
+        with open(path) as fh:
+            for key, solution in json.load(fh):
+                self.entries[key] = tuple(solution) if solution else None
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def save(self, path=None):
+        # Written to a temporary file first, so an interrupted save keeps the old cache
+        path = path or self.path
+        with open(path + '.tmp', 'w') as fh:
+            json.dump(list(self.entries.items()), fh)
+        os.replace(path + '.tmp', path)
+
+if __name__ == "__main__":
+
+    from sudoku_solver_iterative import solve_sudoku
+
+    # Example usage:
+    # Define the Sudoku puzzle as a 9x9 list with 0 representing empty cells
+    sudoku_board = [
+        [5, 3, 0, 0, 7, 0, 0, 0, 0],
+        [6, 0, 0, 1, 9, 5, 0, 0, 0],
+        [0, 9, 8, 0, 0, 0, 0, 6, 0],
+        [8, 0, 0, 0, 6, 0, 0, 0, 3],
+        [4, 0, 0, 8, 0, 3, 0, 0, 1],
+        [7, 0, 0, 0, 2, 0, 0, 0, 6],
+        [0, 6, 0, 0, 0, 0, 2, 8, 0],
+        [0, 0, 0, 4, 1, 9, 0, 0, 5],
+        [0, 0, 0, 0, 8, 0, 0, 7, 9]
+    ]
+
+    # The same puzzle, transposed, with the digits 1 and 2 swapped
+    # and the first two rows (of the transposed board) swapped
+    equivalent = [[{1: 2, 2: 1}.get(d, d) for d in col] for col in zip(*sudoku_board)]
+    equivalent[0], equivalent[1] = equivalent[1], equivalent[0]
+
+    cache = SolutionCache(maxsize=1000)
+
+    for board in (sudoku_board, equivalent):
+        solution = cache.solve(board, solve_sudoku)
+
+        if solution:
+            for row in solution:
+                print(row)
+        else:
+            print("No solution exists.")
+        print()
+
+    print(cache.stats())
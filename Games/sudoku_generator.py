@@ -0,0 +1,197 @@
+#!/usr/bin/python
+
+# Generate random Sudoku puzzles with a unique solution.
+
+# A random filled grid is built by a search over the candidate grid, with
+# the digits of every cell tried in random order. The clues are then removed
+# in random order, each one only if the puzzle keeps a unique solution, which
+# gives a minimal puzzle (no clue can be removed anymore) unless a target
+# number of clues is reached first.
+
+# Removing the clue d of a cell keeps the solution unique if and only if the
+# puzzle has no solution with another digit in that cell. So every step is a
+# single search for one solution, with d eliminated from the cell, instead
+# of counting the solutions of the whole puzzle.
+
+# The difficulty of a puzzle is rated by the deductions that the iterative
+# solver needs:
+#   easy    naked and hidden singles only
+#   medium  also pairs, pointing pairs or box/line reduction, but no guessing
+#   hard    guessing
+# When a difficulty is given, removals that would make the puzzle harder are
+# skipped, and the puzzles that end up easier are discarded.
+
+# A puzzle that misses its target (too many clues left, or the wrong
+# difficulty) is generated again from a new grid, up to MAX_ATTEMPTS times,
+# after which generate() fails with a ValueError. Minimal 9x9 puzzles have
+# about 22 to 26 clues, so targets below about 20 clues are impractical
+# (17 is the least possible, and such puzzles are extremely rare).
+
+# The puzzles are written one per line, in the format read by
+# sudoku_batch_solver.py, with '.' for the empty cells.
+
+# Usage:
+#   python sudoku_generator.py 1000 > puzzles.txt
+#   python sudoku_generator.py 1000 -d hard -j 8 > hard.txt
+#   python sudoku_generator.py 100 -n 16 -t 120 -s 42
+#   python sudoku_generator.py 10 -t 21 -a 1000
+
+import argparse
+import multiprocessing
+import random
+import sys
+import time
+
+from functools import partial
+
+from sudoku_board import CandidateGrid, SearchStats
+from sudoku_solver_iterative import solve_sudoku, search_solutions
+from sudoku import format_puzzle
+
+DIFFICULTIES = ['easy', 'medium', 'hard']
+
+MAX_ATTEMPTS = 100
+
+def random_grid(size, rng):
+
+    # A random filled grid, with `size` rows
+
+    def fill(grid):
+        cell = grid.most_constrained()
+
+        if cell is None:
+            return grid
+
+        nums = grid.geo.digits[grid.cands[cell]][:]
+        rng.shuffle(nums)
+
+        for num in nums:
+            child = grid.copy()
+            if child.assign(cell, num) and child.propagate():
+                solution = fill(child)
+                if solution:
+                    return solution
+
+        return None
+
+    grid = fill(CandidateGrid([[0] * size for i in range(size)]))
+    return [grid.values[size*i : size*i + size] for i in range(size)]
+
+def can_remove(board, row, col):
+
+    # True if the clue at (row, col) can be removed, keeping the solution unique
+
+    num = board[row][col]
+    board[row][col] = 0
+
+    grid = CandidateGrid(board)
+    unique = (not grid.eliminate(row * len(board) + col, 1 << (num - 1))
+              or not grid.propagate()
+              or not search_solutions(grid, 1))
+
+    board[row][col] = num
+    return unique
+
+def rate(board):
+
+    # The difficulty of a puzzle, as an index in DIFFICULTIES
+
+    stats = SearchStats()
+    solve_sudoku([row[:] for row in board], stats)
+
+    if stats.nodes:
+        return 2
+    if stats.eliminations:
+        return 1
+    return 0
+
+def generate(size=9, clues=None, difficulty=None, rng=random, attempts=MAX_ATTEMPTS):
+
+    # A random puzzle with a unique solution, with at most `clues` clues
+    # and of the given difficulty, if any
+
+    level = DIFFICULTIES.index(difficulty) if difficulty else None
+
+    for attempt in range(attempts):
+        board = random_grid(size, rng)
+        count = size * size
+
+        cells = [(row, col) for row in range(size) for col in range(size)]
+        rng.shuffle(cells)
+
+        for row, col in cells:
+            if clues is not None and count <= clues:
+                break
+
+            if not can_remove(board, row, col):
+                continue
+
+            num = board[row][col]
+            board[row][col] = 0
+
+            if level is not None and rate(board) > level:
+                board[row][col] = num
+                continue
+
+            count -= 1
+
+        if clues is not None and count > clues:
+            continue  # the puzzle became minimal before reaching the target
+
+        if level is not None and rate(board) != level:
+            continue
+
+        return board
+
+    target = []
+    if clues is not None:
+        target.append("at most %d clues" % clues)
+    if difficulty:
+        target.append("difficulty %s" % difficulty)
+
+    raise ValueError("no puzzle with %s found in %d attempts" % (' and '.join(target), attempts))
+
+def generate_puzzle(seed, size, clues, difficulty, attempts=MAX_ATTEMPTS):
+    rng = random.Random(seed)
+    return format_puzzle(generate(size, clues, difficulty, rng, attempts))
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Generate Sudoku puzzles with a unique solution.")
+    parser.add_argument('count', nargs='?', type=int, default=1, help="number of puzzles")
+    parser.add_argument('-n', '--size', type=int, default=9, help="board size (9, 16, 25, ...)")
+    parser.add_argument('-t', '--clues', type=int, default=None, help="target number of clues")
+    parser.add_argument('-d', '--difficulty', choices=DIFFICULTIES, default=None, help="difficulty tier")
+    parser.add_argument('-a', '--attempts', type=int, default=MAX_ATTEMPTS, help="grids tried per puzzle before giving up")
+    parser.add_argument('-j', '--processes', type=int, default=1, help="number of worker processes")
+    parser.add_argument('-s', '--seed', type=int, default=None, help="random seed, for repeatable output")
+    parser.add_argument('-o', '--output', default='-', help="puzzle file (default: stdout)")
+    args = parser.parse_args()
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+
+    # Every puzzle has its own seed, so the output does not depend on the
+    # number of processes
+    base  = random.randrange(1 << 64) if args.seed is None else args.seed
+    seeds = ["%d-%d" % (base, i) for i in range(args.count)]
+    task  = partial(generate_puzzle, size=args.size, clues=args.clues, difficulty=args.difficulty,
+                    attempts=args.attempts)
+
+    start_time = time.perf_counter()
+
+    try:
+        if args.processes == 1:
+            for puzzle in map(task, seeds):
+                print(puzzle, file=out)
+        else:
+            with multiprocessing.Pool(args.processes) as pool:
+                for puzzle in pool.imap(task, seeds, chunksize=16):
+                    print(puzzle, file=out)
+    except ValueError as error:
+        sys.exit("error: %s" % error)
+
+    elapsed = time.perf_counter() - start_time
+    out.flush()
+
+    print("Generated %d puzzles in %.3f seconds (%.1f puzzles/minute)"
+          % (args.count, elapsed, 60 * args.count / elapsed if elapsed else 0), file=sys.stderr)
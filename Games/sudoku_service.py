@@ -0,0 +1,329 @@
+#!/usr/bin/python
+
+# Long-running Sudoku solver service, with a pool of warm worker processes.
+
+# Requests are read as JSON lines, from stdin or from the clients of a local
+# (Unix) socket, and every request gets one JSON line back, with its "id":
+#
+#   {"id": 1, "puzzle": "53..7....6..195..."}
+#       -> {"id": 1, "solution": "534678912672195..."}
+#
+#   {"id": 2, "puzzle": "...", "engine": "dancing_links", "timeout": 0.5}
+#       -> {"id": 2, "error": "timeout"}
+#
+#   {"id": 3, "op": "stats"}
+#       -> {"id": 3, "stats": {"requests": ..., "p50": ..., "p95": ..., "p99": ...}}
+#
+# The puzzles are given as in sudoku.py. The errors are
+# "timeout", "no solution", "invalid puzzle", "invalid request" and
+# "internal error" (a solver or a worker that failed on the request, which
+# does not stop the service).
+
+# The solves run in a pool of worker processes, which are all started, and
+# import the solvers, before the first request is read. They are started by
+# a fork server, so they do not inherit the connections of the clients.
+# Every solve has a deadline (the "timeout" of the request, or the default
+# of the service): the worker interrupts the search when it expires, and is
+# then free for the next request. The requests are answered as soon as they
+# are solved, so the responses of a client may come in a different order
+# than its requests.
+
+# At most --max-pending requests are accepted at any time. When they are
+# all taken, the service stops reading requests until one of them is done,
+# so that a client sending faster than the workers can solve waits instead
+# of filling the memory of the service. Only one request per worker is
+# handed to the pool at a time, and the others wait in the service: so the
+# deadline of a request (and the guard of the service around it) starts when
+# a worker takes it, not while it waits for one.
+
+# The latencies (from the reading of a request to its response) of the last
+# LATENCY_WINDOW requests give the percentiles returned by the stats request.
+
+# Usage:
+#   python sudoku_service.py < requests.jsonl > responses.jsonl
+#   python sudoku_service.py --socket /tmp/sudoku.sock -j 4 --timeout 2
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import stat
+import sys
+import time
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from sudoku import NO_SOLUTION, load, parse_puzzle, format_solution
+from sudoku_batch_solver import ENGINES
+from sudoku_board import percentile
+
+LATENCY_WINDOW = 10000
+
+class Deadline(Exception):
+    pass
+
+def on_deadline(signum, frame):
+    raise Deadline()
+
+def warm_up():
+    # Import the solvers and build the tables of the classic board in advance
+    for engine in ENGINES:
+        try:
+            load(engine)
+        except ImportError:
+            pass  # e.g. NumPy is not installed
+    signal.signal(signal.SIGALRM, on_deadline)
+
+def ready():
+    return os.getpid()
+
+def solve_in_worker(line, engine, timeout):
+
+    # Runs in a worker process. Returns the solution, or the error.
+
+    try:
+        board = parse_puzzle(line)
+    except ValueError:
+        return None, "invalid puzzle"
+
+    try:
+        return solve_board(board, engine, timeout)
+    except Exception as error:
+        print("solver error on %r: %r" % (line, error), file=sys.stderr)
+        return None, "internal error"
+
+def solve_board(board, engine, timeout):
+    solver = load(engine)
+
+    if timeout:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+
+    # The timer is stopped in the inner block, so a deadline expiring just
+    # as the solver returns is still caught by the outer one
+    try:
+        try:
+            result = solver(board)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    except Deadline:
+        return None, "timeout"
+
+    solution = format_solution(result)
+
+    if solution == NO_SOLUTION:
+        return None, "no solution"
+
+    return solution, None
+
+class SolverService:
+
+    def __init__(self, processes=None, max_pending=None, timeout=10.0, engine='iterative'):
+        processes = processes or os.cpu_count()
+
+        self.processes = processes
+        self.pool      = ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('forkserver'),
+                                             initializer=warm_up)
+        self.slots     = asyncio.Semaphore(max_pending or 2 * processes)
+        self.workers   = asyncio.Semaphore(processes)
+        self.timeout   = timeout
+        self.engine    = engine
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests  = 0
+        self.timeouts  = 0
+        self.pending   = 0
+
+    async def start(self):
+        # Start all the workers now, instead of on the first requests
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, ready) for i in range(self.processes)))
+
+    async def handle(self, reader, write):
+
+        # Serve the JSON-lines requests of a stream, writing the responses
+        # with write(line)
+
+        tasks = set()
+
+        async for line in reader:
+            line = line.strip()
+            if not line:
+                continue
+
+            # Back-pressure: wait for a free slot before reading on
+            await self.slots.acquire()
+
+            task = asyncio.create_task(self.process(line, write))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        await asyncio.gather(*tasks)
+
+    async def process(self, line, write):
+        start_time = time.perf_counter()
+        self.pending += 1
+
+        try:
+            response = await self.respond(line)
+        finally:
+            self.pending -= 1
+            self.slots.release()
+
+        self.latencies.append(time.perf_counter() - start_time)
+        write(json.dumps(response) + '\n')
+
+    async def respond(self, line):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            request = None
+
+        if not isinstance(request, dict):
+            return {'id': None, 'error': "invalid request"}
+
+        response = {'id': request.get('id')}
+
+        if request.get('op') == 'stats':
+            response['stats'] = self.stats()
+            return response
+
+        engine  = request.get('engine', self.engine)
+        timeout = request.get('timeout', self.timeout)
+
+        if (engine not in ENGINES or not isinstance(request.get('puzzle'), str)
+                or not isinstance(timeout, (int, float)) or timeout < 0):
+            response['error'] = "invalid request"
+            return response
+
+        self.requests += 1
+
+        # Wait for a free worker, which is taken until the solve is really
+        # over, even if the guard below answers the client first
+        await self.workers.acquire()
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.pool, solve_in_worker, request['puzzle'], engine, timeout)
+        future.add_done_callback(self.worker_done)
+
+        # The worker enforces the deadline itself; this one is only a guard
+        # against a worker that does not get back in time
+        try:
+            solution, error = await asyncio.wait_for(asyncio.shield(future), timeout + 1.0 if timeout else None)
+        except asyncio.TimeoutError:
+            solution, error = None, "timeout"
+        except Exception as exception:
+            print("worker error: %r" % exception, file=sys.stderr)
+            solution, error = None, "internal error"
+
+        if error == "timeout":
+            self.timeouts += 1
+
+        if error:
+            response['error'] = error
+        else:
+            response['solution'] = solution
+
+        return response
+
+    def worker_done(self, future):
+        self.workers.release()
+        if not future.cancelled():
+            future.exception()  # retrieved, when the guard answered first
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        stats = {
+            'requests' : self.requests,
+            'timeouts' : self.timeouts,
+            'pending'  : self.pending,
+        }
+        if latencies:
+            stats.update({
+                'p50' : percentile(latencies, 50),
+                'p95' : percentile(latencies, 95),
+                'p99' : percentile(latencies, 99),
+                'max' : latencies[-1],
+            })
+        return stats
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+async def file_lines(fh):
+    # The lines of a file that cannot be read through a pipe transport (a
+    # regular file, /dev/null, ...), read one at a time in a thread, so that
+    # the back-pressure still applies
+    loop = asyncio.get_running_loop()
+    while True:
+        line = await loop.run_in_executor(None, fh.readline)
+        if not line:
+            return
+        yield line
+
+async def serve_stdin(service):
+    loop = asyncio.get_running_loop()
+
+    mode = os.fstat(sys.stdin.fileno()).st_mode
+
+    if stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode):
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    else:
+        reader = file_lines(sys.stdin.buffer)
+
+    def write(line):
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+    await service.handle(reader, write)
+
+async def serve_socket(service, path):
+
+    async def client(reader, writer):
+        try:
+            await service.handle(reader, lambda line: writer.write(line.encode()))
+            await writer.drain()
+        finally:
+            writer.close()
+
+    server = await asyncio.start_unix_server(client, path)
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        os.unlink(path)
+
+async def main(args):
+    service = SolverService(args.processes, args.max_pending, args.timeout, args.engine)
+
+    # Shut down cleanly (stopping the workers) when terminated
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+
+    try:
+        await service.start()
+
+        if args.socket:
+            await serve_socket(service, args.socket)
+        else:
+            await serve_stdin(service)
+    finally:
+        service.close()
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Serve Sudoku solves over JSON lines.")
+    parser.add_argument('--socket', default=None, help="Unix socket to listen on (default: stdin/stdout)")
+    parser.add_argument('-e', '--engine', choices=sorted(ENGINES), default='iterative', help="default solver")
+    parser.add_argument('-j', '--processes', type=int, default=None, help="number of worker processes")
+    parser.add_argument('-p', '--max-pending', type=int, default=None, help="requests solved at once (default: 2 per process)")
+    parser.add_argument('-t', '--timeout', type=float, default=10.0, help="default deadline of a solve, in seconds (0 for none)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
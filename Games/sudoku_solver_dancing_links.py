@@ -0,0 +1,210 @@
+#!/usr/bin/python
+
+# Solve Sudoku puzzle (Knuth's Algorithm X with Dancing Links).
+
+# A Sudoku of size N (with n x n boxes, N = n^2) is modeled as an exact-cover
+# problem with 4*N^2 columns (324 for the classic 9x9 board):
+#   N^2 cell constraints   (each cell holds exactly one digit)
+#   N^2 row constraints    (each digit appears once in every row)
+#   N^2 column constraints (each digit appears once in every column)
+#   N^2 box constraints    (each digit appears once in every box)
+# and N^3 rows, one for every (row, col, digit) placement, each covering 4 columns.
+
+# The links are stored in flat integer lists (L, R, U, D, C), indexed by
+# node number, instead of one Python object per node, so that cover() and
+# uncover() are just a few list assignments. The column headers are nodes
+# 1..4*N^2 and node 0 is the root. The structure for the empty grid is built
+# once per board size and copied for every puzzle.
+
+from math import isqrt
+
+from sudoku_board import board_rows
+
+def build_links(N):
+    n = isqrt(N)
+    ncols = 4 * N * N
+
+    L = list(range(-1, ncols))
+    R = list(range(1, ncols + 2))
+    L[0], R[ncols] = ncols, 0
+
+    U = list(range(ncols + 1))
+    D = list(range(ncols + 1))
+    C = list(range(ncols + 1))
+    S = [0] * (ncols + 1)
+
+    for row in range(N):
+        for col in range(N):
+            box = n * (row // n) + col // n
+            for d in range(N):
+                columns = [
+                    1 + N * row + col,
+                    1 + N * N + N * row + d,
+                    1 + 2 * N * N + N * col + d,
+                    1 + 3 * N * N + N * box + d,
+                ]
+                first = len(C)
+                for k, c in enumerate(columns):
+                    x = first + k
+                    # Insert the node at the bottom of column c
+                    U.append(U[c])
+                    D.append(c)
+                    D[U[c]] = x
+                    U[c] = x
+                    C.append(c)
+                    S[c] += 1
+                    # Link the 4 nodes of the row in a circular list
+                    L.append(x - 1 if k > 0 else first + 3)
+                    R.append(x + 1 if k < 3 else first)
+
+    return L, R, U, D, S, C
+
+LINKS = {}
+
+def solve_sudoku(board, stats=None):
+    rows = board_rows(board)
+    N = len(rows)
+    ncols = 4 * N * N
+
+    # The counters of the run are collected in stats, if given (a SearchStats)
+    if stats is not None:
+        stats.start()
+
+    if N not in LINKS:
+        if isqrt(N) ** 2 != N:
+            raise ValueError("invalid Sudoku size: %d" % N)
+        LINKS[N] = build_links(N)
+
+    # The column of every node never changes, only the links and sizes are copied
+    L, R, U, D, S = (links[:] for links in LINKS[N][:5])
+    C = LINKS[N][5]
+
+    def cover(c):
+        L[R[c]] = L[c]
+        R[L[c]] = R[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                U[D[j]] = U[j]
+                D[U[j]] = D[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(c):
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                U[D[j]] = j
+                D[U[j]] = j
+                j = L[j]
+            i = U[i]
+        L[R[c]] = c
+        R[L[c]] = c
+
+    # Select the rows given by the clues
+    covered = [False] * (ncols + 1)
+    for row in range(N):
+        for col in range(N):
+            d = rows[row][col]
+            if d:
+                r = ncols + 1 + 4 * (N * (N * row + col) + d - 1)
+                for j in range(r, r + 4):
+                    if covered[C[j]]:
+                        return None  # The clues contradict each other
+                    covered[C[j]] = True
+                    cover(C[j])
+
+    if stats is not None:
+        stats.lap('setup')
+
+    solution = []
+
+    def search():
+        c = R[0]
+        if c == 0:
+            return True  # All constraints are satisfied
+
+        # Choose the column with the fewest remaining rows
+        size = S[c]
+        j = R[c]
+        while j != 0 and size > 1:
+            if S[j] < size:
+                c, size = j, S[j]
+            j = R[j]
+
+        if size == 0:
+            return False
+
+        cover(c)
+
+        r = D[c]
+        while r != c:
+            solution.append(r)
+
+            if stats is not None:
+                stats.enter(len(solution))
+
+            j = R[r]
+            while j != r:
+                cover(C[j])
+                j = R[j]
+
+            if search():
+                return True
+
+            j = L[r]
+            while j != r:
+                uncover(C[j])
+                j = L[j]
+
+            solution.pop()
+            r = D[r]
+
+            if stats is not None:
+                stats.backtracks += 1
+
+        uncover(c)
+        return False
+
+    solved = search()
+
+    if stats is not None:
+        stats.lap('search')
+
+    if not solved:
+        return None
+
+    for r in solution:
+        row, rest = divmod((r - ncols - 1) // 4, N * N)
+        col, d = divmod(rest, N)
+        rows[row][col] = d + 1
+
+    return board
+
+if __name__ == "__main__":
+
+    # Example usage:
+    # Define the Sudoku puzzle as a 9x9 list with 0 representing empty cells
+    sudoku_board = [
+        [8, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 3, 6, 0, 0, 0, 0, 0],
+        [0, 7, 0, 0, 9, 0, 2, 0, 0],
+        [0, 5, 0, 0, 0, 7, 0, 0, 0],
+        [0, 0, 0, 0, 4, 5, 7, 0, 0],
+        [0, 0, 0, 1, 0, 0, 0, 3, 0],
+        [0, 0, 1, 0, 0, 0, 0, 6, 8],
+        [0, 0, 8, 5, 0, 0, 0, 1, 0],
+        [0, 9, 0, 0, 0, 0, 4, 0, 0]
+    ]
+
+    solution = solve_sudoku(sudoku_board)
+
+    if solution:
+        for row in solution:
+            print(row)
+    else:
+        print("No solution exists.")
@@ -6,166 +6,188 @@
 
 # Fast iterative algorithm to solve the Sudoku puzzle.
 
-def is_valid(board, row, col, num):
-    # Check if the number is not present in the current row and column
-    for i in range(9):
-        if board[row][i] == num or board[i][col] == num:
-            return False
+from sudoku_board import CandidateGrid
 
-    # Check if the number is not present in the current 3x3 subgrid
-    start_row, start_col = 3 * (row // 3), 3 * (col // 3)
-    for i in range(3):
-        for j in range(3):
-            if board[start_row + i][start_col + j] == num:
-                return False
+def solve_sudoku_fallback(grid, stats=None, depth=1):
+    # Branch on the most constrained empty cell
+    cell = grid.most_constrained()
 
-    return True
+    if cell is None:
+        return grid  # Puzzle is solved
 
-def find_empty_locations(board):
+    for num in grid.geo.digits[grid.cands[cell]]:
+        if stats is not None:
+            stats.enter(depth)
 
-    empty_locations = []
+        # Try placing the number on a copy of the candidates, and propagate its consequences
+        child = grid.copy()
 
-    # Find all empty positions (cells with 0)
-    for i in range(9):
-        for j in range(9):
-            if board[i][j] == 0:
-                empty_locations.append((i, j))
+        if child.assign(cell, num) and child.propagate():
 
-    return empty_locations
+            # Recursively try to solve the rest of the puzzle
+            solution = solve_sudoku_fallback(child, stats, depth + 1)
 
-def find_empty_location(board):
-    # Find an empty position (cell with 0)
-    for i in range(9):
-        for j in range(9):
-            if board[i][j] == 0:
-                return i, j
-    return None, None  # If the board is filled
+            if solution:
+                return solution
 
-def solve_sudoku_fallback(board):
-    row, col = find_empty_location(board)
+        if stats is not None:
+            stats.backtracks += 1
 
-    if row is None and col is None:
-        return True  # Puzzle is solved
+    return None  # No solution found
 
-    for num in range(1, 10):
-        if is_valid(board, row, col, num):
-            # Try placing the number
-            board[row][col] = num
+def solve_sudoku(board, stats=None):
 
-            # Recursively try to solve the rest of the puzzle
-            if solve_sudoku_fallback(board):
-                return True
+    # The counters of the run are collected in stats, if given (a SearchStats)
+    if stats is not None:
+        stats.start()
 
-            # If placing the current number doesn't lead to a solution, backtrack
-            board[row][col] = 0
+    # Deduce as many cells as possible with naked and hidden singles, naked
+    # and hidden pairs, pointing pairs and box/line reduction, keeping the
+    # candidates of every cell across the passes
+    grid = CandidateGrid(board, stats)
 
-    return False  # No solution found
+    if stats is not None:
+        stats.lap('setup')
 
-def solve_sudoku(board):
+    solved = grid.propagate()
 
-    while True:
+    if stats is not None:
+        stats.lap('propagate')
 
-        empty_locations = find_empty_locations(board)
+    if not solved:
+        return None  # the puzzle has no solution
 
-        if len(empty_locations) == 0:
-            break   # it's solved
+    # Give up try brute-force, still propagating after every guess
+    if grid.empty:
+        grid = solve_sudoku_fallback(grid, stats)
 
-        found = False
+        if stats is not None:
+            stats.lap('search')
 
-        # Solve easy cases
-        for i, j in empty_locations:
-            count = 0
-            value = 0
-            for n in range(1,10):
-                if is_valid(board, i, j, n):
-                    count += 1
-                    value = n
-                    if count > 1: break
-            if count == 1:
-                board[i][j] = value
-                found = True
+        if grid is None:
+            return None
 
-        if found: continue
+    grid.write(board)
+    return board
 
-        # Solve more complex cases
-        stats = [[0]*9 for x in range(10)]
-        for i,j in empty_locations:
-            arr = []
-            for n in range(1, 10):
-                if is_valid(board, i, j, n):
-                    arr.append(n)
-            stats[i][j] = arr
+def search_solutions(grid, limit, stats=None):
 
-        cols    = [ [0]*10 for x in range(10)]
-        rows    = [ [0]*10 for x in range(10)]
-        subgrid = [[[0]*10 for x in range(10)] for y in range(10)]
+    # Search the propagated grid for up to `limit` solutions, returned as
+    # a list of solved grids
 
-        for i,j in empty_locations:
-            for v in stats[i][j]:
-                rows[i][v] += 1
-                cols[j][v] += 1
-                subgrid[3*(i//3)][3*(j//3)][v] += 1
+    solutions = []
 
-        for i,j in empty_locations:
-            for v in stats[i][j]:
-                if (cols[j][v] == 1 or
-                    rows[i][v] == 1 or
-                    subgrid[3*(i//3)][3*(j//3)][v] == 1):
-                    board[i][j] = v
-                    found = True
+    def search(grid, depth):
+        cell = grid.most_constrained()
 
-        if found: continue
+        if cell is None:
+            solutions.append(grid)
+            return len(solutions) >= limit
 
-        # Give up try brute-force
-        solve_sudoku_fallback(board)
-        return board
+        nums = grid.geo.digits[grid.cands[cell]]
 
-    return board
+        for i, num in enumerate(nums):
+            if stats is not None:
+                stats.enter(depth)
 
-# Example usage:
-# Define the Sudoku puzzle as a 9x9 list with 0 representing empty cells
-sudoku_board = [
-        [2, 0, 0, 0, 7, 0, 0, 0, 3],
-        [1, 0, 0, 0, 0, 0, 0, 8, 0],
-        [0, 0, 4, 2, 0, 9, 0, 0, 5],
-        [9, 4, 0, 0, 0, 0, 6, 0, 8],
-        [0, 0, 0, 8, 0, 0, 0, 9, 0],
-        [0, 0, 0, 0, 0, 0, 0, 7, 0],
-        [7, 2, 1, 9, 0, 8, 0, 6, 0],
-        [0, 3, 0, 0, 2, 7, 1, 0, 0],
-        [4, 0, 0, 0, 0, 3, 0, 0, 0]
-]
-
-if True:
-    sudoku_board = [
-        [0, 0, 0, 8, 0, 1, 0, 0, 0],
-        [0, 0, 0, 0, 0, 0, 0, 4, 3],
-        [5, 0, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 0, 0, 7, 0, 8, 0, 0],
-        [0, 0, 0, 0, 0, 0, 1, 0, 0],
-        [0, 2, 0, 0, 3, 0, 0, 0, 0],
-        [6, 0, 0, 0, 0, 0, 0, 7, 5],
-        [0, 0, 3, 4, 0, 0, 0, 0, 0],
-        [0, 0, 0, 2, 0, 0, 6, 0, 0]
-    ]
+            # The last digit can take over the grid itself, as no other
+            # branch of this cell needs it anymore
+            child = grid if i == len(nums) - 1 else grid.copy()
+
+            if child.assign(cell, num) and child.propagate():
+                if search(child, depth + 1):
+                    return True
+
+            if stats is not None:
+                stats.backtracks += 1
+
+        return False
+
+    search(grid, 1)
+    return solutions
+
+def count_solutions(board, limit=2, stats=None):
+
+    # Count the solutions of the puzzle, stopping as soon as `limit` of them
+    # are found (the default of 2 is enough to tell if the solution is unique).
+    # The first solution found is written to the board.
+
+    if stats is not None:
+        stats.start()
 
-if False:
+    grid = CandidateGrid(board, stats)
+
+    if stats is not None:
+        stats.lap('setup')
+
+    solutions = []
+
+    if grid.propagate():
+
+        if stats is not None:
+            stats.lap('propagate')
+
+        solutions = search_solutions(grid, limit, stats)
+
+    if stats is not None:
+        stats.lap('search')
+
+    if solutions:
+        solutions[0].write(board)
+
+    return len(solutions)
+
+def has_unique_solution(board):
+    return count_solutions(board, 2) == 1
+
+if __name__ == "__main__":
+
+    # Example usage:
+    # Define the Sudoku puzzle as a 9x9 list with 0 representing empty cells
     sudoku_board = [
-        [8, 0, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 3, 6, 0, 0, 0, 0, 0],
-        [0, 7, 0, 0, 9, 0, 2, 0, 0],
-        [0, 5, 0, 0, 0, 7, 0, 0, 0],
-        [0, 0, 0, 0, 4, 5, 7, 0, 0],
-        [0, 0, 0, 1, 0, 0, 0, 3, 0],
-        [0, 0, 1, 0, 0, 0, 0, 6, 8],
-        [0, 0, 8, 5, 0, 0, 0, 1, 0],
-        [0, 9, 0, 0, 0, 0, 4, 0, 0]
+            [2, 0, 0, 0, 7, 0, 0, 0, 3],
+            [1, 0, 0, 0, 0, 0, 0, 8, 0],
+            [0, 0, 4, 2, 0, 9, 0, 0, 5],
+            [9, 4, 0, 0, 0, 0, 6, 0, 8],
+            [0, 0, 0, 8, 0, 0, 0, 9, 0],
+            [0, 0, 0, 0, 0, 0, 0, 7, 0],
+            [7, 2, 1, 9, 0, 8, 0, 6, 0],
+            [0, 3, 0, 0, 2, 7, 1, 0, 0],
+            [4, 0, 0, 0, 0, 3, 0, 0, 0]
     ]
 
-solution = solve_sudoku(sudoku_board)
-
-if solution:
-    for row in solution:
-        print(row)
-else:
-    print("No unique solution exists.")
+    if True:
+        sudoku_board = [
+            [0, 0, 0, 8, 0, 1, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0, 4, 3],
+            [5, 0, 0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 7, 0, 8, 0, 0],
+            [0, 0, 0, 0, 0, 0, 1, 0, 0],
+            [0, 2, 0, 0, 3, 0, 0, 0, 0],
+            [6, 0, 0, 0, 0, 0, 0, 7, 5],
+            [0, 0, 3, 4, 0, 0, 0, 0, 0],
+            [0, 0, 0, 2, 0, 0, 6, 0, 0]
+        ]
+
+    if False:
+        sudoku_board = [
+            [8, 0, 0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 3, 6, 0, 0, 0, 0, 0],
+            [0, 7, 0, 0, 9, 0, 2, 0, 0],
+            [0, 5, 0, 0, 0, 7, 0, 0, 0],
+            [0, 0, 0, 0, 4, 5, 7, 0, 0],
+            [0, 0, 0, 1, 0, 0, 0, 3, 0],
+            [0, 0, 1, 0, 0, 0, 0, 6, 8],
+            [0, 0, 8, 5, 0, 0, 0, 1, 0],
+            [0, 9, 0, 0, 0, 0, 4, 0, 0]
+        ]
+
+    count = count_solutions(sudoku_board, 2)
+
+    if count == 1:
+        for row in sudoku_board:
+            print(row)
+    elif count == 0:
+        print("No solution exists.")
+    else:
+        print("No unique solution exists.")
@@ -0,0 +1,230 @@
+#!/usr/bin/python
+
+# Solve many Sudoku puzzles at once, with NumPy.
+
+# A batch of P puzzles of size N is stored as a (P, N^2) uint8 array of
+# values (0 for the empty cells), with a (P, N^2) array of candidate masks
+# (uint16, or uint32 above 16x16) and a (P, 3N) array of the digits used in
+# every unit. The masks are computed once, and then kept up to date by
+# elimination: the digits placed at every step are removed only from the
+# units of their cells. Every step works on the whole batch with vectorized
+# operations:
+#
+#   contradictions: a repeated digit in a unit, an empty cell without
+#                   candidates, or a missing digit without a place in its unit
+#   naked singles:  empty cells with a single candidate
+#   hidden singles: digits with a single place in a unit
+#
+# The hidden singles are found without counting the places of every digit:
+# going through the N cells of all the units at once, `once` collects the
+# candidates seen in at least one cell and `twice` those seen in two, so
+# once & ~twice are the digits with a single place.
+#
+# The steps are repeated, on the puzzles that are still making progress,
+# until none of them changes. Only the puzzles left unsolved then go to the
+# scalar search of the iterative solver, which applies the stronger rules.
+# (As only singles are applied here, the candidates that the scalar solver
+# starts from are the same masks.)
+
+# Requires NumPy (https://numpy.org).
+
+import numpy as np
+
+from math import isqrt
+
+from sudoku_board import geometry, is_flat, board_rows
+from sudoku_solver_iterative import solve_sudoku as solve_sudoku_scalar
+
+TABLES = {}
+
+def tables(size):
+    # Index arrays and lookup tables for boards with `size` rows
+    if size not in TABLES:
+        geo   = geometry(size)
+        dtype = np.uint16 if size <= 16 else np.uint32
+        TABLES[size] = (
+            np.array(geo.units, dtype=np.intp),                         # (3N, N) cells of every unit
+            np.array(geo.cell_units, dtype=np.intp),                    # (N^2, 3) units of every cell
+            np.array([0] + [1 << d for d in range(size)], dtype=dtype), # digit -> bit
+            dtype(geo.all_digits),
+        )
+    return TABLES[size]
+
+def unit_bits(bits, units):
+
+    # For a (P, N^2) array of masks, the digits present in at least one
+    # cell (once) and in at least two cells (twice) of every unit
+
+    once  = np.zeros((len(bits), len(units)), dtype=bits.dtype)
+    twice = np.zeros_like(once)
+
+    for cells in units.T:
+        mask = bits[:, cells]
+        twice |= once & mask
+        once  |= mask
+
+    return once, twice
+
+def propagate_batch(values):
+
+    # Apply naked and hidden singles to a (P, N^2) array of puzzles, in place.
+    # Returns an array with the status of every puzzle: 1 if solved,
+    # -1 if it has no solution, and 0 if it needs to be searched.
+
+    P, cells = values.shape
+    size = isqrt(cells)
+
+    units, cell_units, bit, all_digits = tables(size)
+    u0, u1, u2 = cell_units.T
+
+    status = np.zeros(P, dtype=np.int8)
+
+    # The digits used in every unit (a repeated clue is a contradiction),
+    # and the candidates of every cell
+    used, repeated = unit_bits(bit[values], units)
+    cands = all_digits & ~(used[:, u0] | used[:, u1] | used[:, u2])
+    cands[values != 0] = 0
+
+    status[repeated.any(axis=1)] = -1
+    active = np.nonzero(status == 0)[0]
+
+    while len(active):
+        V = values[active]
+        M = cands[active]
+        U = used[active]
+
+        empty = V == 0
+
+        # Digits with a single place in a unit
+        once, twice = unit_bits(M, units)
+        hidden = once & ~twice
+
+        invalid = ((empty & (M == 0)).any(axis=1) |
+                   ((all_digits & ~U & ~once) != 0).any(axis=1))
+
+        # A cell is given its hidden single (two of them is a contradiction),
+        # or else its naked single
+        single = M & (hidden[:, u0] | hidden[:, u1] | hidden[:, u2])
+        invalid |= ((single & (single - 1)) != 0).any(axis=1)
+
+        naked = (M & (M - 1)) == 0
+        new = np.where(single != 0, single, np.where(naked, M, 0))
+        new[invalid] = 0
+
+        # The same digit placed twice in a unit
+        placed, clash = unit_bits(new, units)
+        invalid |= (clash != 0).any(axis=1)
+        new[invalid] = 0
+        placed[invalid] = 0
+
+        # Place the digits, and remove them from the candidates of the
+        # units of their cells
+        p, c = np.nonzero(new)
+        V[p, c] = np.log2(new[p, c]).astype(np.uint8) + 1
+        M[p, c] = 0
+        M &= ~(placed[:, u0] | placed[:, u1] | placed[:, u2])
+        U |= placed
+
+        changed = (new != 0).any(axis=1)
+        solved  = ~invalid & ~changed & ~empty.any(axis=1)
+
+        values[active] = V
+        cands[active]  = M
+        used[active]   = U
+
+        status[active[invalid]] = -1
+        status[active[solved]]  = 1
+
+        # A puzzle that changed is checked again on the next step
+        active = active[changed]
+
+    return status
+
+def solve_batch(values, stats=None):
+
+    # Solve a (P, N^2) uint8 array of puzzles, in place. Returns a boolean
+    # array telling which puzzles have been solved. The counters of the
+    # scalar solver are collected in stats, if given (a SearchStats).
+
+    status = propagate_batch(values)
+
+    # The scalar solver works in place on a view of the row of the puzzle
+    for i in np.nonzero(status == 0)[0]:
+        status[i] = 1 if solve_sudoku_scalar(memoryview(values[i]), stats) else -1
+
+    return status == 1
+
+def solve_buffer(buffer, size=9):
+
+    # Solve all the puzzles of a flat buffer (e.g. a bytearray read from a
+    # file), holding one puzzle of size x size cells after the other, in
+    # place and without copying it. Returns a boolean array telling which
+    # puzzles have been solved.
+
+    values = np.frombuffer(buffer, dtype=np.uint8).reshape(-1, size * size)
+    return solve_batch(values)
+
+def solve_boards(boards, stats=None):
+
+    # Solve a list of boards (lists of rows or flat buffers), possibly of
+    # several sizes, in place. Returns the list of solved boards, with None
+    # for the puzzles that have no solution.
+
+    results = [None] * len(boards)
+    sizes   = [len(board_rows(board)) for board in boards]
+
+    for size in set(sizes):
+        index  = [i for i in range(len(boards)) if sizes[i] == size]
+        values = np.array([np.frombuffer(boards[i], dtype=np.uint8) if is_flat(boards[i])
+                           else [n for row in boards[i] for n in row] for i in index], dtype=np.uint8)
+        solved = solve_batch(values, stats)
+
+        for k, i in enumerate(index):
+            if solved[k]:
+                if is_flat(boards[i]):
+                    memoryview(boards[i]).cast('B')[:] = values[k].tobytes()
+                else:
+                    boards[i][:] = values[k].reshape(size, size).tolist()
+                results[i] = boards[i]
+
+    return results
+
+def solve_sudoku(board, stats=None):
+    return solve_boards([board], stats)[0]
+
+if __name__ == "__main__":
+
+    # Example usage:
+    # Define the Sudoku puzzles as 9x9 lists with 0 representing empty cells
+    sudoku_boards = [
+        [
+            [5, 3, 0, 0, 7, 0, 0, 0, 0],
+            [6, 0, 0, 1, 9, 5, 0, 0, 0],
+            [0, 9, 8, 0, 0, 0, 0, 6, 0],
+            [8, 0, 0, 0, 6, 0, 0, 0, 3],
+            [4, 0, 0, 8, 0, 3, 0, 0, 1],
+            [7, 0, 0, 0, 2, 0, 0, 0, 6],
+            [0, 6, 0, 0, 0, 0, 2, 8, 0],
+            [0, 0, 0, 4, 1, 9, 0, 0, 5],
+            [0, 0, 0, 0, 8, 0, 0, 7, 9]
+        ],
+        [
+            [8, 0, 0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 3, 6, 0, 0, 0, 0, 0],
+            [0, 7, 0, 0, 9, 0, 2, 0, 0],
+            [0, 5, 0, 0, 0, 7, 0, 0, 0],
+            [0, 0, 0, 0, 4, 5, 7, 0, 0],
+            [0, 0, 0, 1, 0, 0, 0, 3, 0],
+            [0, 0, 1, 0, 0, 0, 0, 6, 8],
+            [0, 0, 8, 5, 0, 0, 0, 1, 0],
+            [0, 9, 0, 0, 0, 0, 4, 0, 0]
+        ],
+    ]
+
+    for solution in solve_boards(sudoku_boards):
+        if solution:
+            for row in solution:
+                print(row)
+        else:
+            print("No solution exists.")
+        print()
@@ -0,0 +1,153 @@
+#!/usr/bin/python
+
+# Solve very hard (or nearly empty) Sudoku puzzles on several cores.
+
+# The search tree of the iterative solver is expanded breadth-first, from the
+# most constrained cell of every node and with propagation after every
+# guess, until there are about SPLIT_FACTOR subproblems per process. The
+# subproblems (the values of their cells, as bytes) are then handed out one
+# at a time to a pool of worker processes, so a worker that is done with an
+# easy subtree takes the next one while the others are still busy. The pool
+# is terminated as soon as a solution is found, or, when counting, as soon as
+# the limit is reached.
+
+# Easy puzzles are solved during the split itself, without starting any
+# process.
+
+# With a SearchStats object, the workers count their searches and send the
+# counters back with their results, and they are added up in it.
+
+# Usage:
+#   python sudoku_solver_parallel.py
+
+import multiprocessing
+
+from collections import deque
+
+from sudoku_board import CandidateGrid, SearchStats, is_flat, board_rows
+from sudoku_solver_iterative import search_solutions
+
+SPLIT_FACTOR = 8
+
+def split(grid, target):
+
+    # Expand the tree of the propagated grid until it has `target` leaves.
+    # Returns the leaves and the solutions found on the way.
+
+    frontier  = deque([grid])
+    solutions = []
+
+    while frontier and len(frontier) < target:
+        grid = frontier.popleft()
+        cell = grid.most_constrained()
+
+        if cell is None:
+            solutions.append(grid)
+            continue
+
+        for num in grid.geo.digits[grid.cands[cell]]:
+            child = grid.copy()
+            if child.assign(cell, num) and child.propagate():
+                frontier.append(child)
+
+    return list(frontier), solutions
+
+def search_subproblem(task):
+    # Runs in a worker: search the subproblem for up to `limit` solutions,
+    # returning their number, the values of the first one and the counters
+    # of the search (if asked for)
+    values, limit, counted = task
+    stats = SearchStats() if counted else None
+    grid = CandidateGrid(bytearray(values), stats)
+
+    if not grid.propagate():
+        return 0, None, stats
+
+    solutions = search_solutions(grid, limit, stats)
+    return len(solutions), bytes(solutions[0].values) if solutions else None, stats
+
+def search_parallel(board, limit, processes, stats=None):
+
+    # Returns the number of solutions (up to `limit`) and the values of the
+    # first solution found
+
+    processes = processes or multiprocessing.cpu_count()
+
+    if stats is not None:
+        stats.start()
+
+    grid = CandidateGrid(board, stats)
+
+    if not grid.propagate():
+        return 0, None
+
+    leaves, solutions = split(grid, SPLIT_FACTOR * processes)
+
+    count = len(solutions)
+    first = bytes(solutions[0].values) if solutions else None
+
+    if count >= limit or not leaves:
+        if stats is not None:
+            stats.lap('search')
+        return min(count, limit), first
+
+    tasks = [(bytes(leaf.values), limit - count, stats is not None) for leaf in leaves]
+
+    with multiprocessing.Pool(processes) as pool:
+        for n, values, counters in pool.imap_unordered(search_subproblem, tasks):
+            count += n
+            if first is None:
+                first = values
+            if stats is not None:
+                stats.add(counters)
+            if count >= limit:
+                break  # leaving the block terminates the other workers
+
+    if stats is not None:
+        stats.lap('search')
+
+    return min(count, limit), first
+
+def write_values(board, values):
+    if is_flat(board):
+        memoryview(board).cast('B')[:] = values
+    else:
+        N = len(board)
+        for i in range(N):
+            board[i][:] = values[N*i : N*i + N]
+
+def solve_sudoku(board, processes=None, stats=None):
+    count, values = search_parallel(board, 1, processes, stats)
+
+    if not count:
+        return None
+
+    write_values(board, values)
+    return board
+
+def count_solutions(board, limit=2, processes=None, stats=None):
+
+    # Count the solutions of the puzzle, up to `limit`, writing the first
+    # one found to the board
+
+    count, values = search_parallel(board, limit, processes, stats)
+
+    if count:
+        write_values(board, values)
+
+    return count
+
+if __name__ == "__main__":
+
+    # Example usage:
+    # A 16x16 board with only the first row given
+    sudoku_board = [[0] * 16 for i in range(16)]
+    sudoku_board[0] = list(range(1, 17))
+
+    solution = solve_sudoku(sudoku_board)
+
+    if solution:
+        for row in board_rows(solution):
+            print(' '.join("%2d" % n for n in row))
+    else:
+        print("No solution exists.")
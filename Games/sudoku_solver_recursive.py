@@ -2,91 +2,99 @@
 
 # Solve Sudoku puzzle (recursive solution).
 
-def is_valid(board, row, col, num):
-    # Check if the number is not present in the current row and column
-    for i in range(9):
-        if board[row][i] == num or board[i][col] == num:
-            return False
-
-    # Check if the number is not present in the current 3x3 subgrid
-    start_row, start_col = 3 * (row // 3), 3 * (col // 3)
-    for i in range(3):
-        for j in range(3):
-            if board[start_row + i][start_col + j] == num:
-                return False
-
-    return True
-
-def find_empty_location(board):
-    # Find an empty position (cell with 0)
-    for i in range(9):
-        for j in range(9):
-            if board[i][j] == 0:
-                return i, j
-    return None, None  # If the board is filled
-
-def solve_sudoku(board):
-    row, col = find_empty_location(board)
-
-    if row is None and col is None:
-        return True  # Puzzle is solved
-
-    for num in range(1, 10):
-        if is_valid(board, row, col, num):
+from sudoku_board import CountedBoardState
+
+def solve_sudoku(board, stats=None):
+
+    # The counters of the run are collected in stats, if given (a SearchStats)
+    if stats is not None:
+        stats.start()
+
+    state = CountedBoardState(board)
+
+    if stats is not None:
+        stats.lap('setup')
+
+    if not state.valid:
+        return False
+
+    def solve(depth):
+        # Branch on the most constrained empty cell (or digit placement)
+        moves = state.choices()
+
+        if moves is None:
+            return True  # Puzzle is solved
+
+        for row, col, num in moves:
+            if stats is not None:
+                stats.enter(depth)
+
             # Try placing the number
-            board[row][col] = num
+            state.place(row, col, num)
 
             # Recursively try to solve the rest of the puzzle
-            if solve_sudoku(board):
+            if solve(depth + 1):
                 return True
 
             # If placing the current number doesn't lead to a solution, backtrack
-            board[row][col] = 0
-
-    return False  # No solution found
-
-# Example usage:
-# Define the Sudoku puzzle as a 9x9 list with 0 representing empty cells
-sudoku_board = [
-    [5, 3, 0, 0, 7, 0, 0, 0, 0],
-    [6, 0, 0, 1, 9, 5, 0, 0, 0],
-    [0, 9, 8, 0, 0, 0, 0, 6, 0],
-    [8, 0, 0, 0, 6, 0, 0, 0, 3],
-    [4, 0, 0, 8, 0, 3, 0, 0, 1],
-    [7, 0, 0, 0, 2, 0, 0, 0, 6],
-    [0, 6, 0, 0, 0, 0, 2, 8, 0],
-    [0, 0, 0, 4, 1, 9, 0, 0, 5],
-    [0, 0, 0, 0, 8, 0, 0, 7, 9]
-]
-
-if False:
-    sudoku_board = [
-        [0, 0, 0, 8, 0, 1, 0, 0, 0],
-        [0, 0, 0, 0, 0, 0, 0, 4, 3],
-        [5, 0, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 0, 0, 7, 0, 8, 0, 0],
-        [0, 0, 0, 0, 0, 0, 1, 0, 0],
-        [0, 2, 0, 0, 3, 0, 0, 0, 0],
-        [6, 0, 0, 0, 0, 0, 0, 7, 5],
-        [0, 0, 3, 4, 0, 0, 0, 0, 0],
-        [0, 0, 0, 2, 0, 0, 6, 0, 0]
-    ]
+            state.unplace(row, col)
+
+            if stats is not None:
+                stats.backtracks += 1
+
+        return False  # No solution found
+
+    solved = solve(1)
+
+    if stats is not None:
+        stats.lap('search')
 
-if False:
+    return solved
+
+if __name__ == "__main__":
+
+    # Example usage:
+    # Define the Sudoku puzzle as a 9x9 list with 0 representing empty cells
     sudoku_board = [
-        [8, 0, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 3, 6, 0, 0, 0, 0, 0],
-        [0, 7, 0, 0, 9, 0, 2, 0, 0],
-        [0, 5, 0, 0, 0, 7, 0, 0, 0],
-        [0, 0, 0, 0, 4, 5, 7, 0, 0],
-        [0, 0, 0, 1, 0, 0, 0, 3, 0],
-        [0, 0, 1, 0, 0, 0, 0, 6, 8],
-        [0, 0, 8, 5, 0, 0, 0, 1, 0],
-        [0, 9, 0, 0, 0, 0, 4, 0, 0]
+        [5, 3, 0, 0, 7, 0, 0, 0, 0],
+        [6, 0, 0, 1, 9, 5, 0, 0, 0],
+        [0, 9, 8, 0, 0, 0, 0, 6, 0],
+        [8, 0, 0, 0, 6, 0, 0, 0, 3],
+        [4, 0, 0, 8, 0, 3, 0, 0, 1],
+        [7, 0, 0, 0, 2, 0, 0, 0, 6],
+        [0, 6, 0, 0, 0, 0, 2, 8, 0],
+        [0, 0, 0, 4, 1, 9, 0, 0, 5],
+        [0, 0, 0, 0, 8, 0, 0, 7, 9]
     ]
 
-if solve_sudoku(sudoku_board):
-    for row in sudoku_board:
-        print(row)
-else:
-    print("No solution exists.")
+    if False:
+        sudoku_board = [
+            [0, 0, 0, 8, 0, 1, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0, 4, 3],
+            [5, 0, 0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 7, 0, 8, 0, 0],
+            [0, 0, 0, 0, 0, 0, 1, 0, 0],
+            [0, 2, 0, 0, 3, 0, 0, 0, 0],
+            [6, 0, 0, 0, 0, 0, 0, 7, 5],
+            [0, 0, 3, 4, 0, 0, 0, 0, 0],
+            [0, 0, 0, 2, 0, 0, 6, 0, 0]
+        ]
+
+    if False:
+        sudoku_board = [
+            [8, 0, 0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 3, 6, 0, 0, 0, 0, 0],
+            [0, 7, 0, 0, 9, 0, 2, 0, 0],
+            [0, 5, 0, 0, 0, 7, 0, 0, 0],
+            [0, 0, 0, 0, 4, 5, 7, 0, 0],
+            [0, 0, 0, 1, 0, 0, 0, 3, 0],
+            [0, 0, 1, 0, 0, 0, 0, 6, 8],
+            [0, 0, 8, 5, 0, 0, 0, 1, 0],
+            [0, 9, 0, 0, 0, 0, 4, 0, 0]
+        ]
+
+    if solve_sudoku(sudoku_board):
+        for row in sudoku_board:
+            print(row)
+    else:
+        print("No solution exists.")
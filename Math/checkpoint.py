@@ -0,0 +1,74 @@
+#!/usr/bin/python
+
+# Resumable runs of independent work units, saved to a checkpoint directory.
+
+# The result of every unit is saved to its own file (as JSON) as soon as the
+# unit is done: written to a temporary file, flushed to disk, then renamed.
+# So an interrupted run loses at most the units in progress, and running
+# again on the same directory skips the units already saved. The parameters
+# of the run are saved in the directory too, and a run with different
+# parameters is refused.
+
+# Several processes or nodes can share the directory (e.g. on a network file
+# system), each one taking its own shard (i, n) of the units: the units
+# i, i+n, i+2n, ... The results are returned once all the units are saved,
+# by whichever run finds them complete.
+
+import json
+import multiprocessing
+import os
+import socket
+
+def unit_path(directory, index):
+    return os.path.join(directory, "unit-%06d.json" % index)
+
+def save(path, data):
+    temp = "%s.%s.%d.tmp" % (path, socket.gethostname(), os.getpid())
+    with open(temp, 'w') as fh:
+        json.dump(data, fh)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(temp, path)
+
+def load(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+def check_params(directory, params):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, 'params.json')
+    if not os.path.exists(path):
+        save(path, params)
+    if load(path) != json.loads(json.dumps(params)):
+        raise ValueError("checkpoint %r was made with other parameters" % directory)
+
+def run_unit(args):
+    worker, index, task = args
+    return index, worker(task)
+
+def run_units(directory, params, tasks, worker, processes=1, shard=(0, 1)):
+
+    # Run worker(task) for the unsaved tasks of the shard, saving every
+    # result. Returns the results of all the tasks, in order, or None while
+    # some of them (of other shards) are missing.
+
+    check_params(directory, dict(params, units=len(tasks)))
+
+    index, shards = shard
+    todo = [(worker, i, tasks[i]) for i in range(index, len(tasks), shards)
+            if not os.path.exists(unit_path(directory, i))]
+
+    if processes == 1:
+        for i, result in map(run_unit, todo):
+            save(unit_path(directory, i), result)
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            for i, result in pool.imap_unordered(run_unit, todo):
+                save(unit_path(directory, i), result)
+
+    paths = [unit_path(directory, i) for i in range(len(tasks))]
+
+    if not all(os.path.exists(path) for path in paths):
+        return None
+
+    return [load(path) for path in paths]
@@ -0,0 +1,197 @@
+#!/usr/bin/python
+
+# Carmichael, Lucas-Carmichael and related numbers, in one walk of the search tree.
+
+# For a shift a, the terms are the odd squarefree composites n such that
+# p + a divides n + a for every prime p dividing n: a = -1 gives the
+# Carmichael numbers (Korselt's criterion), a = +1 the Lucas-Carmichael
+# numbers. All the families search the same tree of products m of
+# increasing primes, so they are walked together: every node carries, for
+# each shift, the lcm l of the p + a of its primes, or None once no term of
+# that family can be below it, and a branch is pruned when all the families
+# are dead there.
+
+# A prime p cannot extend m for the shift a when m and p + a have a common
+# prime factor not dividing a (it would divide n and n + a). For the last
+# prime p, l must divide m*p + a, which gives the class of p modulo l, and
+# p + a must divide a*(m - 1), which bounds p and, when the class has many
+# candidates, lets the divisors of a*(m - 1) be enumerated instead.
+
+from primes import primerange, isprime, prime, iroot, divisors
+from math import lcm, gcd
+from bisect import bisect_left
+
+import multiprocessing
+
+DIVISORS_THRESHOLD = 1000
+SPLIT_FACTOR = 16
+
+SHIFTS = (-1, 1)
+NAMES  = {-1: 'Carmichael', 1: 'Lucas-Carmichael'}
+
+def last_prime(m, l, lo, hi, a, inv=None):
+
+    # The primes p in [lo, hi) making m*p a term for the shift a, given the
+    # inverse of m modulo a multiple of l, if known
+
+    # p + a divides a*(m - 1)
+    bound = abs(a) * (m - 1) - a + 1
+    if hi > bound:
+        hi = bound
+
+    # m*p = -a (mod l)
+    if inv is not None:
+        u = -a * inv % l
+    elif a == 1 or a == -1:
+        u = -a * pow(m, -1, l) % l
+    else:
+        if lo < 1 - a:
+            lo = 1 - a
+        g = gcd(m, l)
+        if a % g: return ()
+        l //= g
+        u = (-a // g) * pow(m // g, -1, l) % l
+
+    if u < lo:
+        u += (lo - u + l - 1) // l * l
+
+    if u >= hi: return ()
+
+    if (hi - u) // l > DIVISORS_THRESHOLD:
+        return [p for p in (d - a for d in divisors(abs(a) * (m - 1)))
+                if lo <= p < hi and (p - u) % l == 0 and isprime(p)]
+
+    primes = []
+    for p in range(u, hi, l):
+        if (m*p + a) % (p + a) == 0 and isprime(p):
+            primes.append(p)
+    return primes
+
+def korselt_iter(A, B, n, shifts=SHIFTS, m=1, ls=None, lo=3):
+
+    # Pairs (a, term) for the terms in [A, B] with n >= 2 prime factors, unordered
+
+    # The shifts +1 and -1 are coprime to every m
+    unit = all(a in (1, -1) for a in shifts)
+
+    def f(m, ls, lo, k):
+
+        hi = iroot(B // m, k)+1
+        families = [(a, l) for a, l in zip(shifts, ls) if l is not None]
+
+        if k == 2:
+            # The last two primes p < q are chosen in one loop: the bounds of
+            # q are shared by all the shifts, and so is the inverse of m*p
+            # (modulo the product of their l)
+            for p in primerange(lo, hi):
+                mp = m*p
+                q_lo = p + 2
+                if A > mp * q_lo:
+                    q_lo = -(-A // mp)
+                q_hi = B // mp + 1
+                if q_lo >= q_hi:
+                    continue
+                alive = []
+                L = 1
+                for a, l in families:
+                    if p + a > 0 and a % gcd(m, p + a) == 0:
+                        l = lcm(l, p + a)
+                        alive.append((a, l))
+                        L *= l
+                if alive:
+                    inv = pow(mp, -1, L) if unit else None
+                    for a, l in alive:
+                        for q in last_prime(mp, l, q_lo, q_hi, a, inv):
+                            yield a, mp*q
+            return
+
+        for p in primerange(lo, hi):
+            children = [lcm(l, p + a) if l is not None and p + a > 0 and a % gcd(m, p + a) == 0 else None
+                        for a, l in zip(shifts, ls)]
+            if children.count(None) < len(children):
+                yield from f(m*p, children, p + 2, k - 1)
+
+    return f(m, ls or [1] * len(shifts), lo, n)
+
+def korselt(A, B, n, shifts=SHIFTS):
+    terms = {a: [] for a in shifts}
+    for a, c in korselt_iter(A, B, n, shifts):
+        terms[a].append(c)
+    return {a: sorted(terms[a]) for a in shifts}
+
+def korselt_tasks(B, n, shifts, count):
+    # Split the search into about `count` subtrees (m, ls, lo, k), largest first
+    tasks = [(1, [1] * len(shifts), 3, n)]
+    while len(tasks) < count and any(k > 2 for m, ls, lo, k in tasks):
+        children = []
+        for m, ls, lo, k in tasks:
+            if k <= 2:
+                children.append((m, ls, lo, k))
+                continue
+            hi = iroot(B // m, k)+1
+            for p in primerange(lo, hi):
+                child = [lcm(l, p + a) if l is not None and p + a > 0 and a % gcd(m, p + a) == 0 else None
+                         for a, l in zip(shifts, ls)]
+                if child.count(None) < len(child):
+                    children.append((m*p, child, p + 2, k - 1))
+        tasks = children
+    return sorted(tasks, key=lambda t: (B / t[0]) ** (1 - 1/t[3]), reverse=True)
+
+def korselt_subtree(task):
+    # Runs in a worker: the counts of a subtree in [A, limits[i]], for every shift
+    A, B, limits, shifts, n, m, ls, lo, k = task
+    rows = {a: [0] * len(limits) for a in shifts}
+    for a, c in korselt_iter(A, B, k, shifts, m, ls, lo):
+        rows[a][bisect_left(limits, c)] += 1
+    return n, rows
+
+def run_tasks(tasks, processes):
+    if processes == 1:
+        yield from map(korselt_subtree, tasks)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        yield from pool.imap_unordered(korselt_subtree, tasks)
+
+def korselt_counts(A, limits, shifts=SHIFTS, processes=1):
+    # counts[a][k][i] = number of terms for the shift a, with k prime
+    # factors, in [A, limits[i]]
+    limits = sorted(limits)
+    B = limits[-1]
+    k = 3
+    l = 3*5*7
+    ks = []
+    while l < B:
+        ks.append(k)
+        k += 1
+        l *= prime(k+1)
+    counts = {a: {k: [0] * len(limits) for k in ks} for a in shifts}
+    if processes == 1:
+        tasks = [(A, B, limits, shifts, k, 1, None, 3, k) for k in ks]
+    else:
+        processes = processes or multiprocessing.cpu_count()
+        tasks = [(A, B, limits, shifts, k) + t for k in ks for t in korselt_tasks(B, k, shifts, SPLIT_FACTOR * processes)]
+        tasks.sort(key=lambda t: (B / t[5]) ** (1 - 1/t[8]), reverse=True)
+    for k, rows in run_tasks(tasks, processes):
+        for a in shifts:
+            for i in range(len(limits)):
+                counts[a][k][i] += rows[a][i]
+    for a in shifts:
+        for row in counts[a].values():
+            for i in range(1, len(row)):
+                row[i] += row[i-1]
+    return counts
+
+if __name__ == "__main__":
+
+    print("Carmichael and Lucas-Carmichael numbers with 3 prime factors below 10^4:")
+
+    for a, terms in korselt(1, 10**4, 3).items():
+        print("%16s: %s" % (NAMES[a], terms))
+
+    print("\nNumber of Carmichael and Lucas-Carmichael numbers less than 10^n:")
+
+    limits = [10**n for n in range(1, 10+1)]
+    counts = korselt_counts(1, limits, processes=None)
+
+    for n in range(1, 10+1):
+        print("%2d: %s" % (n, "  ".join("%d" % sum(row[n-1] for row in counts[a].values()) for a in SHIFTS)))
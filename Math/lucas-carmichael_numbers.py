@@ -1,10 +1,17 @@
 #!/usr/bin/python
 
-from sympy.ntheory import sieve, isprime, prime
-from sympy.core import integer_nthroot
+from primes import primerange, isprime, prime, iroot, divisors
+from checkpoint import run_units
 from math import lcm, gcd, isqrt
+from bisect import bisect_left
 
-def lucas_carmichael(A, B, n):
+import multiprocessing
+
+DIVISORS_THRESHOLD = 1000
+SPLIT_FACTOR = 16
+CHECKPOINT_UNITS = 1024
+
+def lucas_carmichael_iter(A, B, n, m=1, l=1, lo=3):
     max_p = isqrt(B)+1
 
     def f(m, l, lo, k):
@@ -12,7 +19,10 @@ def lucas_carmichael(A, B, n):
         if k == 1:
 
             lo = max(lo, A // m + (1 if A % m else 0))
-            hi = min(B // m + 1, max_p)
+            hi = min(B // m + 1, max_p, m)
+
+            if lo >= hi: return
+
             u  = l - pow(m, -1, l)
 
             if u < lo:
@@ -22,43 +32,149 @@ def lucas_carmichael(A, B, n):
 
             if u > hi: return
 
+            # p+1 must divide m-1: when there are many candidates in the
+            # residue class, enumerate the divisors of m-1 instead
+            if (hi - u) // l > DIVISORS_THRESHOLD:
+                for d in divisors(m - 1):
+                    p = d - 1
+                    if lo <= p < hi and (p - u) % l == 0 and isprime(p):
+                        yield m*p
+                return
+
             for p in range(u, hi, l):
                 if (m*p+1) % (p+1) == 0 and isprime(p):
                     yield m*p
 
         else:
-            hi = (integer_nthroot(B // m, k))[0]+1
-            for p in sieve.primerange(lo, hi):
+            hi = iroot(B // m, k)+1
+            for p in primerange(lo, hi):
                 if gcd(m, p+1) == 1:
                     yield from f(m*p, lcm(l, p+1), p + 2, k - 1)
 
-    return sorted(f(1, 1, 3, n))
+    return f(m, l, lo, n)
+
+def lucas_carmichael(A, B, n):
+    return sorted(lucas_carmichael_iter(A, B, n))
+
+def lucas_carmichael_stream(A, B, n, ratio=2):
+    # The terms in [A, B] (B = None for no bound) in increasing order, found
+    # window by window: [x, ratio*x], then the next one from ratio*x + 1
+    x = A
+    while B is None or x <= B:
+        y = max(x + 1, int(ratio * x))
+        if B is not None:
+            y = min(y, B)
+        yield from sorted(lucas_carmichael_iter(x, y, n))
+        x = y + 1
+
+def lucas_carmichael_first(A, B, n):
+    # The least term in [A, B], or None: the search stops at the first
+    # window that has terms
+    return next(lucas_carmichael_stream(A, B, n), None)
+
+def lucas_carmichael_tasks(B, n, count):
+    # Split the search into about `count` subtrees (m, l, lo, k), expanding
+    # the top levels, and order them by their estimated size (B/m)^(1-1/k)
+    tasks = [(1, 1, 3, n)]
+    while len(tasks) < count and any(k > 2 for m, l, lo, k in tasks):
+        children = []
+        for m, l, lo, k in tasks:
+            if k <= 2:
+                children.append((m, l, lo, k))
+                continue
+            hi = iroot(B // m, k)+1
+            for p in primerange(lo, hi):
+                if gcd(m, p+1) == 1:
+                    children.append((m*p, lcm(l, p+1), p + 2, k - 1))
+        tasks = children
+    return sorted(tasks, key=lambda t: (B / t[0]) ** (1 - 1/t[3]), reverse=True)
+
+def lucas_carmichael_subtree(task):
+    # Runs in a worker: the terms of a subtree, or their counts in [A, limits[i]]
+    A, B, limits, n, m, l, lo, k = task
+    if limits is None:
+        return n, list(lucas_carmichael_iter(A, B, k, m, l, lo))
+    row = [0] * len(limits)
+    for c in lucas_carmichael_iter(A, B, k, m, l, lo):
+        row[bisect_left(limits, c)] += 1
+    return n, row
+
+def run_tasks(tasks, processes):
+    if processes == 1:
+        yield from map(lucas_carmichael_subtree, tasks)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        yield from pool.imap_unordered(lucas_carmichael_subtree, tasks)
+
+def lucas_carmichael_parallel(A, B, n, processes=None, checkpoint=None, shard=(0, 1)):
+    # With a checkpoint directory, the subtrees are the CHECKPOINT_UNITS work
+    # units of checkpoint.py, and None is returned while some are missing
+    processes = processes or multiprocessing.cpu_count()
+    if checkpoint is not None:
+        tasks = [(A, B, None, n) + t for t in lucas_carmichael_tasks(B, n, CHECKPOINT_UNITS)]
+        results = run_units(checkpoint, {'family': 'lucas_carmichael', 'A': A, 'B': B, 'n': n},
+                            tasks, lucas_carmichael_subtree, processes, shard)
+        if results is None:
+            return None
+    else:
+        tasks = [(A, B, None, n) + t for t in lucas_carmichael_tasks(B, n, SPLIT_FACTOR * processes)]
+        results = run_tasks(tasks, processes)
+    terms = []
+    for n, found in results:
+        terms += found
+    return sorted(terms)
 
 def LC_with_n_primes(n):
-    x = 2
-    y = 2*x
-    while True:
-        LC = lucas_carmichael(x, y, n)
-        if len(LC) >= 1: return LC[0]
-        x = y+1
-        y = 2*x
+    return lucas_carmichael_first(2, None, n)
 
-def LC_count(A, B):
+def LC_counts(A, limits, processes=1, checkpoint=None, shard=(0, 1)):
+    # counts[k][i] = number of terms with k prime factors in [A, limits[i]]
+    # (with a checkpoint directory, as in lucas_carmichael_parallel())
+    limits = sorted(limits)
+    B = limits[-1]
     k = 3
     l = 3*5*7
-    count = 0
+    counts = {}
     while l < B:
-        count += len(lucas_carmichael(A, B, k))
+        counts[k] = [0] * len(limits)
         k += 1
         l *= prime(k+1)
-    return count
+    if checkpoint is not None:
+        tasks = [(A, B, limits, k) + t for k in counts for t in lucas_carmichael_tasks(B, k, CHECKPOINT_UNITS)]
+        tasks.sort(key=lambda t: (B / t[4]) ** (1 - 1/t[7]), reverse=True)
+        results = run_units(checkpoint, {'family': 'lucas_carmichael', 'A': A, 'limits': limits},
+                            tasks, lucas_carmichael_subtree, processes or multiprocessing.cpu_count(), shard)
+        if results is None:
+            return None
+    elif processes == 1:
+        results = run_tasks([(A, B, limits, k, 1, 1, 3, k) for k in counts], 1)
+    else:
+        processes = processes or multiprocessing.cpu_count()
+        tasks = [(A, B, limits, k) + t for k in counts for t in lucas_carmichael_tasks(B, k, SPLIT_FACTOR * processes)]
+        tasks.sort(key=lambda t: (B / t[4]) ** (1 - 1/t[7]), reverse=True)
+        results = run_tasks(tasks, processes)
+    for k, row in results:
+        for i in range(len(row)):
+            counts[k][i] += row[i]
+    for row in counts.values():
+        for i in range(1, len(row)):
+            row[i] += row[i-1]
+    return counts
+
+def LC_count(A, B):
+    return sum(row[0] for row in LC_counts(A, [B]).values())
+
+if __name__ == "__main__":
+
+    print("Least Lucas-Carmichael number with n prime factors:")
 
-print("Least Lucas-Carmichael number with n prime factors:")
+    for n in range(3, 12+1):
+        print("%2d: %d" % (n, LC_with_n_primes(n)))
 
-for n in range(3, 12+1):
-    print("%2d: %d" % (n, LC_with_n_primes(n)))
+    print("\nNumber of Lucas-Carmichael numbers less than 10^n:")
 
-print("\nNumber of Lucas-Carmichael numbers less than 10^n:")
+    limits = [10**n for n in range(1, 10+1)]
+    counts = LC_counts(1, limits, processes=None)
 
-for n in range(1, 10+1):
-    print("%2d: %d" % (n, LC_count(1, 10**n)))
+    for n in range(1, 10+1):
+        print("%2d: %d" % (n, sum(row[n-1] for row in counts.values())))
@@ -0,0 +1,322 @@
+#!/usr/bin/python
+
+# Prime number functions used by the Carmichael scripts, without sympy.
+
+# primerange(lo, hi)  primes in [lo, hi), from a cached sieve below CACHE_LIMIT
+#                     and from a segmented sieve of the odd numbers above it
+# isprime(n)          trial division by the primes below 100, then a
+#                     deterministic Miller-Rabin test for n < 3.3 * 10^24
+# prime(k)            the k-th prime (prime(1) = 2)
+# iroot(n, k)         the integer k-th root of n
+# factorint(n)        trial division, then Pollard-Brent rho
+# divisors(n)         all the divisors of n
+
+# The cache of primes grows by doubling, but never beyond CACHE_LIMIT, so
+# large ranges do not keep their primes in memory. sympy, if installed, is
+# only used to test numbers above 3.3 * 10^24, and only imported then.
+
+# With a table file (the PRIMES_TABLE environment variable, or use_table()),
+# the primes are read from the file instead of being sieved: one bit per odd
+# number (bit k of byte j for 16j + 2k + 1), memory-mapped, so that all the
+# processes reading it share one copy in the page cache. The file is built
+# on first use and extended (to at least twice its size) when a larger
+# bound is needed, by writing a new file that replaces the old one. The
+# table is read one segment at a time, as the sieve is, and only the primes
+# below TABLE_CACHE_LIMIT are cached in each process; the rest are read from
+# the shared map.
+
+import mmap
+import os
+
+from bisect import bisect_left
+from itertools import chain, compress, count, islice
+from math import gcd, isqrt, log, prod
+
+CACHE_LIMIT       = 1 << 22
+TABLE_CACHE_LIMIT = 1 << 16
+SEGMENT_SIZE      = 1 << 18
+
+PRIMES = [2, 3, 5, 7]
+SIEVED = 10
+
+TABLE_PATH = os.environ.get('PRIMES_TABLE')
+TABLE      = None
+
+# Binary digits to flags
+BITS = bytes.maketrans(b'01', b'\x00\x01')
+
+SMALL_PRIMES  = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59, 61, 67, 71, 73, 79, 83, 89, 97]
+SMALL_SET     = set(SMALL_PRIMES)
+SMALL_PRODUCT = prod(SMALL_PRIMES)
+
+# Miller-Rabin bases that give a deterministic test below each bound
+MR_BASES = [
+    (2047,                      (2,)),
+    (1373653,                   (2, 3)),
+    (25326001,                  (2, 3, 5)),
+    (3215031751,                (2, 3, 5, 7)),
+    (2152302898747,             (2, 3, 5, 7, 11)),
+    (3474749660383,             (2, 3, 5, 7, 11, 13)),
+    (341550071728321,           (2, 3, 5, 7, 11, 13, 17)),
+    (3825123056546413051,       (2, 3, 5, 7, 11, 13, 17, 19, 23)),
+    (318665857834031151167461,  (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)),
+    (3317044064679887385961981, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)),
+]
+
+def sieve(n):
+    # Primes below n, with a sieve of the odd numbers
+    if n < 3:
+        return []
+    odd = bytearray([1]) * (n // 2)
+    odd[0] = 0
+    for i in range(1, (isqrt(n - 1) - 1) // 2 + 1):
+        if odd[i]:
+            p = 2*i + 1
+            odd[p*p // 2 :: p] = bytes(len(range(p*p // 2, n // 2, p)))
+    return [2] + list(compress(range(1, n, 2), odd))
+
+def cache_limit():
+    # The bound of the cached primes, small when a table holds the others
+    return TABLE_CACHE_LIMIT if TABLE_PATH else CACHE_LIMIT
+
+def extend(n):
+    # Cache the primes below n (up to cache_limit())
+    global PRIMES, SIEVED
+    limit = cache_limit()
+    if n > SIEVED and SIEVED < limit:
+        SIEVED = min(max(n, 2 * SIEVED), limit)
+        PRIMES = sieve(SIEVED)
+
+def sieve_segment(start, size, base):
+
+    # Flags of the `size` odd numbers from `start` (odd), 1 for the primes,
+    # given the odd primes up to the square root of the last one
+
+    end = start + 2*size
+    odd = bytearray([1]) * size
+
+    for p in base:
+        if p*p >= end:
+            break
+        m = max(p*p, (start + p - 1) // p * p)
+        if m % 2 == 0:
+            m += p
+        i = (m - start) // 2
+        odd[i::p] = bytes(len(range(i, size, p)))
+
+    if start == 1:
+        odd[0] = 0
+
+    return odd
+
+def segments(lo, hi):
+    # Primes in [lo, hi), for lo > 2, sieved one segment at a time
+    base = list(primerange(3, isqrt(hi - 1) + 1))
+    start = lo | 1
+    while start < hi:
+        size = min(SEGMENT_SIZE, (hi - start + 1) // 2)
+        yield from compress(range(start, start + 2*size, 2), sieve_segment(start, size, base))
+        start += 2*size
+
+def pack(odd):
+    # One bit per flag, for a multiple of 8 flags
+    bits = 0
+    for k in range(8):
+        bits |= int.from_bytes(odd[k::8], 'little') << k
+    return bits.to_bytes(len(odd) // 8, 'little')
+
+def build_table(path, hi):
+
+    # Write the table of the primes below hi (or more) to path, keeping the
+    # part already in the file
+
+    old  = os.path.getsize(path) if os.path.exists(path) else 0
+    size = max(-(-hi // 16), 2 * old)
+    base = sieve(isqrt(16 * size) + 1)[1:]
+    temp = "%s.%d.tmp" % (path, os.getpid())
+
+    with open(temp, 'wb') as out:
+        if old:
+            with open(path, 'rb') as fh:
+                out.write(fh.read(old))
+
+        start = 16 * old + 1
+        while start < 16 * size:
+            n = min(SEGMENT_SIZE, 8 * size - start // 2)
+            out.write(pack(sieve_segment(start, n, base)))
+            start += 2 * n
+
+    os.replace(temp, path)
+
+def open_table(hi):
+    # Map the table, building or extending its file first if it stops below hi
+    global TABLE
+    if not os.path.exists(TABLE_PATH) or 16 * os.path.getsize(TABLE_PATH) < hi:
+        build_table(TABLE_PATH, hi)
+    if TABLE is not None:
+        TABLE.close()
+    with open(TABLE_PATH, 'rb') as fh:
+        TABLE = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+def use_table(path):
+    # Read the primes from the table at path. Also set in the environment,
+    # for the worker processes that are started afterwards.
+    global TABLE_PATH, TABLE, PRIMES, SIEVED
+    os.environ['PRIMES_TABLE'] = TABLE_PATH = path
+    if TABLE is not None:
+        TABLE.close()
+    TABLE  = None
+    PRIMES = [2, 3, 5, 7]
+    SIEVED = 10
+
+def table_range(lo, hi):
+
+    # Odd primes in [lo, hi), for lo > 2, read from the table, one segment
+    # of SEGMENT_SIZE odd numbers at a time
+
+    if TABLE is None or 16 * len(TABLE) < hi:
+        open_table(hi)
+
+    step = SEGMENT_SIZE // 8
+    end  = -(-hi // 16)
+
+    for j in range(lo // 16, end, step):
+
+        # The bits, lowest first, as one flag per odd number (without the
+        # trailing zeros, which compress() does not need)
+        first = 16 * j + 1
+        bits = int.from_bytes(TABLE[j : min(j + step, end)], 'little')
+        odd = format(bits, 'b')[::-1].encode().translate(BITS)
+
+        i = max(0, (lo - first + 1) // 2)
+        n = min(8 * step, (hi - first + 1) // 2)
+        yield from compress(range(first + 2*i, first + 2*n, 2), odd[i:n])
+
+def primerange(lo, hi):
+    limit = cache_limit()
+    if hi <= limit:
+        extend(hi)
+        return PRIMES[bisect_left(PRIMES, lo) : bisect_left(PRIMES, hi)]
+    high = (table_range if TABLE_PATH else segments)(max(lo, limit), hi)
+    if lo >= limit:
+        return high
+    return chain(primerange(lo, limit), high)
+
+def prime(k):
+    # The k-th prime, below k*(log(k) + log(log(k))) for k >= 6
+    bound = 14 if k < 6 else int(k * (log(k) + log(log(k)))) + 1
+    extend(bound)
+    if k <= len(PRIMES):
+        return PRIMES[k - 1]
+    return next(islice(primerange(SIEVED, bound), k - len(PRIMES) - 1, None))
+
+def miller_rabin(n, bases):
+    d = n - 1
+    s = (d & -d).bit_length() - 1
+    d >>= s
+    for a in bases:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for i in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+def isprime(n):
+    if n < 100:
+        return n in SMALL_SET
+    if gcd(n, SMALL_PRODUCT) != 1:
+        return False
+    if n < 10201:
+        return True
+    for bound, bases in MR_BASES:
+        if n < bound:
+            return miller_rabin(n, bases)
+    try:
+        from sympy import isprime as sympy_isprime
+    except ImportError:
+        return miller_rabin(n, SMALL_PRIMES)  # a probable prime
+    return sympy_isprime(n)
+
+def iroot(n, k):
+    if n < 2 or k == 1:
+        return n
+    if k == 2:
+        return isqrt(n)
+    if n < 1 << 50:
+        x = int(round(n ** (1 / k)))
+    else:
+        # Newton's method, from above
+        x = 1 << -(-n.bit_length() // k)
+        while True:
+            y = ((k - 1) * x + n // x**(k - 1)) // k
+            if y >= x:
+                break
+            x = y
+    while x**k > n:
+        x -= 1
+    while (x + 1)**k <= n:
+        x += 1
+    return x
+
+def pollard_brent(n):
+    # A nontrivial factor of the odd composite n
+    for c in count(1):
+        y, r, q, g = 2, 1, 1, 1
+        while g == 1:
+            x = y
+            for i in range(r):
+                y = (y*y + c) % n
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                for i in range(min(128, r - k)):
+                    y = (y*y + c) % n
+                    q = q * abs(x - y) % n
+                g = gcd(q, n)
+                k += 128
+            r *= 2
+        if g == n:
+            g = 1
+            while g == 1:
+                ys = (ys*ys + c) % n
+                g = gcd(abs(x - ys), n)
+        if g != n:
+            return g
+
+def factorint(n):
+    factors = {}
+    for p in primerange(2, 1000):
+        if p*p > n:
+            break
+        while n % p == 0:
+            factors[p] = factors.get(p, 0) + 1
+            n //= p
+    stack = [n] if n > 1 else []
+    while stack:
+        n = stack.pop()
+        if n < 1000000 or isprime(n):
+            factors[n] = factors.get(n, 0) + 1
+        else:
+            d = pollard_brent(n)
+            stack += [d, n // d]
+    return factors
+
+def divisors(n):
+    divs = [1]
+    for p, e in factorint(n).items():
+        divs = [d * p**i for d in divs for i in range(e + 1)]
+    return divs
+
+if __name__ == "__main__":
+
+    # Example usage:
+    print(primerange(90, 110))
+    print(list(islice(primerange(10**12, 10**12 + 1000), 5)))
+    print([prime(k) for k in (1, 10, 100, 10**6)])
+    print(isprime(2**61 - 1), isprime(2**61 + 1))
+    print(iroot(10**30 + 1, 3), factorint(2**64 + 1), sorted(divisors(360)))